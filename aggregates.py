@@ -0,0 +1,154 @@
+"""
+aggregates.py — Agregados do Dashboard mantidos a cada gravação.
+
+Em vez de recalcular `value_counts`, pivot, médias do radar e mapa de calor
+sobre a aba inteira a cada renderização, este módulo guarda um pequeno
+conjunto de contadores:
+
+  - contagem por pilar × status
+  - soma e quantidade de scores por pilar (média do radar)
+  - total de avaliações por avaliador e por estudante
+
+Cada avaliação salva aplica só a diferença antiga → nova (ver
+`google_sheets.subscribe_evaluations`); um novo download do snapshot faz
+uma reconstrução completa, que também serve para conferir os contadores.
+"""
+
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+import google_sheets as db
+from agreement import PILLAR_KEYS, PILLAR_NAMES
+
+STATUSES = ["Atendeu", "Parcialmente", "Não Atendeu"]
+
+# Converter Categorias para Números (Mapeamento de Score)
+SCORE_MAP = {"Atendeu": 2, "Parcialmente": 1, "Não Atendeu": 0, "Pendente": 0}
+
+_STATUS_POS = {status: i for i, status in enumerate(STATUSES)}
+
+
+class DashboardAggregates(db.PatchListener):
+    """Contadores do Dashboard, atualizados incrementalmente por versão do snapshot."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._reset()
+
+    def _reset(self):
+        self.status_counts = np.zeros((len(PILLAR_KEYS), len(STATUSES)), dtype=np.int64)
+        self.score_sums = np.zeros(len(PILLAR_KEYS), dtype=np.int64)
+        self.score_counts = np.zeros(len(PILLAR_KEYS), dtype=np.int64)
+        self.by_evaluator = Counter()
+        self.by_student = Counter()
+        self.total = 0
+
+    def _apply(self, row: dict, sign: int):
+        for p, key in enumerate(PILLAR_KEYS):
+            value = row.get(key)
+            if value in _STATUS_POS:
+                self.status_counts[p, _STATUS_POS[value]] += sign
+            if value in SCORE_MAP:
+                self.score_sums[p] += sign * SCORE_MAP[value]
+                self.score_counts[p] += sign
+        for counter, value in ((self.by_evaluator, row.get('avaliador')),
+                               (self.by_student, row.get('estudante'))):
+            counter[value] += sign
+            if counter[value] <= 0:
+                del counter[value]
+        self.total += sign
+
+    def _rebuild(self, df: pd.DataFrame, version):
+        self._reset()
+        self._version = version
+        if df.empty:
+            return
+        for p, key in enumerate(PILLAR_KEYS):
+            if key not in df.columns:
+                continue
+            counts = df[key].value_counts()
+            self.status_counts[p] = [counts.get(status, 0) for status in STATUSES]
+            scores = df[key].map(SCORE_MAP)
+            self.score_sums[p] = int(scores.sum())
+            self.score_counts[p] = int(scores.notna().sum())
+        for counter, col in ((self.by_evaluator, 'avaliador'), (self.by_student, 'estudante')):
+            if col in df.columns:
+                counter.update(df[col].value_counts().to_dict())
+        self.total = len(df)
+
+    def _apply_patch(self, old_row, new_row):
+        if old_row is not None:
+            self._apply(old_row, -1)
+        self._apply(new_row, +1)
+
+    def refresh(self, df: pd.DataFrame, version):
+        """Garante que os contadores correspondem ao snapshot `version`."""
+        with self._lock:
+            if self._version is None or self._version != version:
+                self._rebuild(df, version)
+
+    def verify(self, df: pd.DataFrame) -> bool:
+        """Confere os contadores atuais contra uma reconstrução completa de `df`."""
+        full = DashboardAggregates()
+        full._rebuild(df, None)
+        with self._lock:
+            return (
+                np.array_equal(self.status_counts, full.status_counts)
+                and np.array_equal(self.score_sums, full.score_sums)
+                and np.array_equal(self.score_counts, full.score_counts)
+                and self.by_evaluator == full.by_evaluator
+                and self.by_student == full.by_student
+                and self.total == full.total
+            )
+
+    # ── Visões prontas para os gráficos ──────────────────────────────────────
+
+    def summary(self) -> dict:
+        """Totais para as métricas do topo do Dashboard."""
+        with self._lock:
+            return {
+                "total": self.total,
+                "students": len(self.by_student),
+                "evaluators": len(self.by_evaluator),
+            }
+
+    def status_pivot(self) -> pd.DataFrame:
+        """Pilar × Status (contagens), na ordem fixa dos 7 Ds."""
+        with self._lock:
+            return pd.DataFrame(
+                self.status_counts.copy(),
+                index=pd.Index([PILLAR_NAMES[k] for k in PILLAR_KEYS], name='Pilar'),
+                columns=pd.Index(STATUSES, name='Status'),
+            )
+
+    def radar(self) -> pd.DataFrame:
+        """Média do score por pilar."""
+        with self._lock:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means = self.score_sums / self.score_counts
+            return pd.DataFrame({
+                "Pilar": [PILLAR_NAMES[k] for k in PILLAR_KEYS],
+                "Score": np.where(self.score_counts > 0, means, np.nan),
+            })
+
+    def evaluator_totals(self) -> pd.Series:
+        with self._lock:
+            return pd.Series(dict(self.by_evaluator), name="Avaliações").sort_values(ascending=False)
+
+
+aggregates = DashboardAggregates()
+db.subscribe_evaluations(aggregates.on_patch)
+
+
+def dashboard_aggregates(df: pd.DataFrame, version) -> DashboardAggregates:
+    """Agregados do snapshot `version` (reconstruídos só se estiverem defasados)."""
+    if version is None:
+        view = DashboardAggregates()
+        view.refresh(df, version)
+        return view
+    aggregates.refresh(df, version)
+    return aggregates
@@ -0,0 +1,345 @@
+"""
+agreement.py — Concordância entre avaliadores, calculada de uma vez para
+todos os estudantes.
+
+Uma única passada de groupby sobre o snapshot de avaliações produz, por
+estudante, o número de avaliações, os pilares com divergência e o status
+(Pendente / Divergente / Consenso). O resultado é cacheado pela versão do
+snapshot (ver `google_sheets.get_evaluations_snapshot`) e compartilhado
+entre a lista do desempatador e o Dashboard.
+
+Também mantém as estatísticas de confiabilidade entre avaliadores por
+pilar — concordância observada, kappa de Cohen (1ª × 2ª avaliação), kappa
+de Fleiss e alfa de Krippendorff ordinal — sobre tabelas de contingência
+NumPy atualizadas incrementalmente a cada avaliação salva.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+import google_sheets as db
+
+PILLAR_KEYS = ['denomine', 'defina', 'descreva', 'de_contexto', 'delimite', 'declare', 'determine']
+
+PILLAR_NAMES = {
+    'denomine':    'Persona',
+    'defina':      'Tarefa',
+    'descreva':    'Etapas',
+    'de_contexto': 'Contexto',
+    'delimite':    'Restrições',
+    'declare':     'Objetivo',
+    'determine':   'Saída',
+}
+
+AGREEMENT_COLUMNS = ['n_evals', 'divergent_pillars', 'status']
+
+
+def compute_agreement(df: pd.DataFrame, by: str = 'email_original') -> pd.DataFrame:
+    """
+    Tabela de concordância indexada por `by` (email_original ou estudante),
+    com as colunas n_evals, divergent_pillars (nomes curtos) e status.
+    """
+    if df.empty or by not in df.columns:
+        return pd.DataFrame(columns=AGREEMENT_COLUMNS)
+
+    pillars = [k for k in PILLAR_KEYS if k in df.columns]
+    grouped = df.groupby(by, sort=False)
+    n_evals = grouped.size()
+    divergent = (grouped[pillars].nunique() > 1).to_numpy()
+    # Um único avaliador nunca "diverge"
+    divergent &= (n_evals.to_numpy() >= 2)[:, None]
+
+    names = np.array([PILLAR_NAMES[k] for k in pillars], dtype=object)
+    status = np.select(
+        [n_evals.to_numpy() < 2, divergent.any(axis=1)],
+        ["Pendente", "Divergente"],
+        default="Consenso",
+    )
+    return pd.DataFrame(
+        {
+            'n_evals': n_evals.to_numpy(),
+            'divergent_pillars': [list(names[row]) for row in divergent],
+            'status': status,
+        },
+        index=n_evals.index,
+    )
+
+
+def compute_comparison(df: pd.DataFrame, by: str = 'estudante'):
+    """
+    Visão compacta: uma linha por estudante com as notas de cada pilar
+    unidas por " / " (em ordem de avaliador), mais a máscara booleana das
+    células em que os avaliadores divergem. Retorna (tabela, máscara).
+    """
+    pillars = [k for k in PILLAR_KEYS if k in df.columns]
+    names = {k: PILLAR_NAMES[k] for k in pillars}
+    if df.empty or by not in df.columns or df[by].isna().all():
+        empty = pd.DataFrame(columns=list(names.values()))
+        return empty, empty.astype(bool)
+
+    ordered = df.sort_values('avaliador', kind='stable') if 'avaliador' in df.columns else df
+    ordered = ordered[ordered[by].notna()]
+    grouped = ordered.groupby(by, sort=False)
+    divergent = grouped[pillars].nunique() > 1
+
+    # Uma coluna por posição do avaliador no estudante (cumcount + unstack);
+    # as notas são unidas coluna a coluna, sem função Python por grupo
+    rank = grouped.cumcount().to_numpy()
+    wide = ordered[pillars].astype(str)
+    wide.index = pd.MultiIndex.from_arrays([ordered[by].to_numpy(), rank])
+    wide = wide.unstack().reindex(divergent.index)
+    n_evals = grouped.size().reindex(divergent.index).to_numpy()
+    joined = pd.DataFrame(index=divergent.index)
+    for k in pillars:
+        text = wide[(k, 0)]
+        for r in range(1, int(rank.max(initial=0)) + 1):
+            text = text.where(n_evals <= r, text + " / " + wide[(k, r)])
+        joined[k] = text
+    return joined.rename(columns=names), divergent.rename(columns=names)
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def comparison_table(df: pd.DataFrame, version, by: str = 'estudante'):
+    """`compute_comparison` cacheado pela versão do snapshot."""
+    if version is None:
+        return compute_comparison(df, by)
+    key = ('comparison', by)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+    result = compute_comparison(df, by)
+    with _cache_lock:
+        _cache[key] = (version, result)
+    return result
+
+
+def agreement_table(df: pd.DataFrame, version, by: str = 'email_original') -> pd.DataFrame:
+    """
+    `compute_agreement` cacheado pela versão do snapshot: enquanto as
+    avaliações não mudam, todas as sessões reutilizam a mesma tabela.
+    """
+    if version is None:
+        return compute_agreement(df, by)
+    with _cache_lock:
+        cached = _cache.get(by)
+        if cached and cached[0] == version:
+            return cached[1]
+    table = compute_agreement(df, by)
+    with _cache_lock:
+        _cache[by] = (version, table)
+    return table
+
+
+# ─── Confiabilidade entre Avaliadores ─────────────────────────────────────────
+
+# Escala ordinal dos pilares (código = posição); "Pendente" não entra no cálculo
+SCALE = ["Não Atendeu", "Parcialmente", "Atendeu"]
+_CODES = {label: code for code, label in enumerate(SCALE)}
+
+RELIABILITY_COLUMNS = ['Estudantes', 'Concordância (%)', 'Kappa de Cohen',
+                       'Kappa de Fleiss', 'Alfa de Krippendorff']
+
+
+def _encode(values) -> np.ndarray:
+    return np.array([_CODES.get(v, -1) for v in values], dtype=np.int64)
+
+
+def percent_agreement(counts: np.ndarray) -> float:
+    """Proporção média de pares de avaliadores que concordam (em %)."""
+    n = counts.sum(axis=1)
+    ok = n >= 2
+    if not ok.any():
+        return np.nan
+    c, n = counts[ok], n[ok]
+    return float(np.mean(((c * c).sum(axis=1) - n) / (n * (n - 1))) * 100)
+
+
+def fleiss_kappa(counts: np.ndarray) -> float:
+    """Kappa de Fleiss (com número variável de avaliadores por estudante)."""
+    n = counts.sum(axis=1)
+    ok = n >= 2
+    if not ok.any():
+        return np.nan
+    c, n = counts[ok], n[ok]
+    p_obs = np.mean(((c * c).sum(axis=1) - n) / (n * (n - 1)))
+    p_cat = c.sum(axis=0) / n.sum()
+    p_exp = float((p_cat ** 2).sum())
+    if p_exp == 1.0:
+        return np.nan
+    return float((p_obs - p_exp) / (1 - p_exp))
+
+
+def cohen_kappa(pairs: np.ndarray) -> float:
+    """Kappa de Cohen sobre pares (1ª avaliação, 2ª avaliação) codificados."""
+    ok = (pairs >= 0).all(axis=1)
+    if not ok.any():
+        return np.nan
+    a, b = pairs[ok, 0], pairs[ok, 1]
+    k = len(SCALE)
+    table = np.bincount(a * k + b, minlength=k * k).reshape(k, k).astype(float)
+    total = table.sum()
+    p_obs = np.trace(table) / total
+    p_exp = float((table.sum(axis=0) * table.sum(axis=1)).sum() / total ** 2)
+    if p_exp == 1.0:
+        return np.nan
+    return float((p_obs - p_exp) / (1 - p_exp))
+
+
+def krippendorff_alpha_ordinal(counts: np.ndarray) -> float:
+    """Alfa de Krippendorff com métrica ordinal, a partir da matriz de coincidências."""
+    n_u = counts.sum(axis=1)
+    ok = n_u >= 2
+    if not ok.any():
+        return np.nan
+    c = counts[ok].astype(float)
+    w = c / (n_u[ok] - 1)[:, None]
+    coincidences = w.T @ c - np.diag(w.sum(axis=0))
+    n_c = coincidences.sum(axis=1)
+    n = n_c.sum()
+    # δ² ordinal: (soma das frequências entre c e k − (n_c + n_k)/2)²
+    cum = np.concatenate([[0.0], np.cumsum(n_c)])
+    lo = np.minimum.outer(np.arange(len(SCALE)), np.arange(len(SCALE)))
+    hi = np.maximum.outer(np.arange(len(SCALE)), np.arange(len(SCALE)))
+    delta = (cum[hi + 1] - cum[lo] - (n_c[:, None] + n_c[None, :]) / 2) ** 2
+    d_exp = (np.outer(n_c, n_c) * delta).sum()
+    if d_exp == 0:
+        return np.nan
+    return float(1 - (n - 1) * (coincidences * delta).sum() / d_exp)
+
+
+class ReliabilityEngine(db.PatchListener):
+    """
+    Tabelas de contingência por pilar, mantidas incrementalmente.
+
+      - counts[p, s, c]: quantos avaliadores deram a categoria c ao estudante s
+      - pairs[p, s, :]:  códigos da 1ª e da 2ª avaliação do estudante s (-1 = ausente)
+
+    Cada gravação aplica só a diferença antiga → nova; um salto de versão do
+    snapshot (novo download) provoca reconstrução vetorizada completa.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._stats = None
+        self._subjects = {}
+        self._slots = {}
+        self._next_slot = []
+        self._counts = np.zeros((len(PILLAR_KEYS), 0, len(SCALE)), dtype=np.int64)
+        self._pairs = np.full((len(PILLAR_KEYS), 0, 2), -1, dtype=np.int64)
+
+    def rebuild(self, df: pd.DataFrame, version):
+        """Reconstrói as tabelas a partir do snapshot inteiro."""
+        with self._lock:
+            self._rebuild(df, version)
+
+    def _rebuild(self, df, version):
+        self._version, self._stats = version, None
+        if df.empty or 'email_original' not in df.columns:
+            self._subjects, self._slots, self._next_slot = {}, {}, []
+            self._counts = np.zeros((len(PILLAR_KEYS), 0, len(SCALE)), dtype=np.int64)
+            self._pairs = np.full((len(PILLAR_KEYS), 0, 2), -1, dtype=np.int64)
+            return
+        subject_ids, subjects = pd.factorize(df['email_original'])
+        slots = df.groupby(subject_ids).cumcount().to_numpy()
+        n_subjects = len(subjects)
+
+        counts = np.zeros((len(PILLAR_KEYS), n_subjects, len(SCALE)), dtype=np.int64)
+        pairs = np.full((len(PILLAR_KEYS), n_subjects, 2), -1, dtype=np.int64)
+        for p, key in enumerate(PILLAR_KEYS):
+            if key not in df.columns:
+                continue
+            codes = _encode(df[key])
+            valid = codes >= 0
+            np.add.at(counts[p], (subject_ids[valid], codes[valid]), 1)
+            first_two = slots < 2
+            pairs[p, subject_ids[first_two], slots[first_two]] = codes[first_two]
+
+        self._counts, self._pairs = counts, pairs
+        self._subjects = {title: i for i, title in enumerate(subjects)}
+        self._next_slot = np.bincount(subject_ids, minlength=n_subjects).tolist()
+        keys = df['user_key'] if 'user_key' in df.columns else [None] * len(df)
+        self._slots = {
+            key: (int(s), int(slot)) for key, s, slot in zip(keys, subject_ids, slots)
+        }
+
+    def _apply_patch(self, old_row, new_row):
+        key = new_row.get('user_key')
+        if key in self._slots:
+            s, slot = self._slots[key]
+        else:
+            title = new_row.get('email_original')
+            if title not in self._subjects:
+                self._subjects[title] = self._counts.shape[1]
+                self._counts = np.concatenate(
+                    [self._counts, np.zeros((len(PILLAR_KEYS), 1, len(SCALE)), dtype=np.int64)],
+                    axis=1,
+                )
+                self._pairs = np.concatenate(
+                    [self._pairs, np.full((len(PILLAR_KEYS), 1, 2), -1, dtype=np.int64)],
+                    axis=1,
+                )
+                self._next_slot.append(0)
+            s = self._subjects[title]
+            slot = self._next_slot[s]
+            self._next_slot[s] += 1
+            self._slots[key] = (s, slot)
+
+        old_codes = _encode([(old_row or {}).get(k) for k in PILLAR_KEYS])
+        new_codes = _encode([new_row.get(k) for k in PILLAR_KEYS])
+        for p in range(len(PILLAR_KEYS)):
+            if old_codes[p] >= 0:
+                self._counts[p, s, old_codes[p]] -= 1
+            if new_codes[p] >= 0:
+                self._counts[p, s, new_codes[p]] += 1
+            if slot < 2:
+                self._pairs[p, s, slot] = new_codes[p]
+        self._stats = None
+
+    def statistics(self, df: pd.DataFrame, version) -> pd.DataFrame:
+        """Estatísticas por pilar + linha "Geral", cacheadas pela versão."""
+        with self._lock:
+            if self._version is None or self._version != version:
+                self._rebuild(df, version)
+            if self._stats is None:
+                self._stats = self._compute()
+            return self._stats
+
+    def _compute(self) -> pd.DataFrame:
+        rows = {}
+        for p, key in enumerate(PILLAR_KEYS):
+            rows[PILLAR_NAMES[key]] = self._row(self._counts[p], self._pairs[p])
+        # Geral: cada (estudante, pilar) é uma unidade
+        rows['Geral'] = self._row(
+            self._counts.reshape(-1, len(SCALE)), self._pairs.reshape(-1, 2)
+        )
+        rows['Geral'][0] = int((self._counts.sum(axis=2).max(axis=0, initial=0) >= 2).sum())
+        return pd.DataFrame.from_dict(rows, orient='index', columns=RELIABILITY_COLUMNS)
+
+    @staticmethod
+    def _row(counts, pairs):
+        return [
+            int((counts.sum(axis=1) >= 2).sum()),
+            percent_agreement(counts),
+            cohen_kappa(pairs),
+            fleiss_kappa(counts),
+            krippendorff_alpha_ordinal(counts),
+        ]
+
+
+reliability = ReliabilityEngine()
+db.subscribe_evaluations(reliability.on_patch)
+
+
+def reliability_table(df: pd.DataFrame, version) -> pd.DataFrame:
+    """Estatísticas de confiabilidade do snapshot `version` (ver `ReliabilityEngine`)."""
+    if version is None:
+        engine = ReliabilityEngine()
+        return engine.statistics(df, version)
+    return reliability.statistics(df, version)
@@ -1,14 +1,18 @@
 import streamlit as st
 import pandas as pd
-import json
 import os
 import re
 from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
+import aggregates
+import agreement
+import assignments
 import google_sheets as db
+import prefetch
+import transcripts
 
-# Initialize Google Sheets (ensure headers)
+# Initialize Google Sheets (ensure headers — migração única por processo)
 db.init_sheet()
 
 # Page Configuration
@@ -138,11 +142,25 @@ div[role="radiogroup"] label[data-baseweb="radio"] {
 # ── Usuários com visão total ───────────────────────────────────────────────────
 ADMIN_USERS = ["admin", "taciana"]
 TIEBREAKER_USER = "brunohipolito"
+# Fora do rodízio da distribuição (ver assignments.py). O desempatador não
+# ocupa posição na ordem de cadastro: designações para ele nunca seriam avaliadas.
+OUTSIDE_ROTATION = ADMIN_USERS + [TIEBREAKER_USER]
 ALLOW_NEW_USERS = False
 
+# Exportação dos estudantes: conversations.json ou chat.html (ver transcripts.py)
+CONVERSATIONS_FILE = db.get_setting("conversations_file", "conversations.json")
+
+# Quantos estudantes seguintes da lista são pré-carregados na Avaliação
+PREFETCH_AHEAD = int(db.get_setting("prefetch_ahead", 3))
+
+# Meta de avaliações por estudante: a distribuição para de designar quem a
+# atingiu (e o Dashboard mostra a cobertura)
+REVIEWS_PER_STUDENT = int(db.get_setting("reviews_per_student", assignments.DEFAULT_REVIEWS_PER_STUDENT))
+
 # ── Ranges personalizados de estudantes por avaliador ─────────────────────────
 # Chave: username (minúsculo), Valor: range OU lista de índices base-0
-# Avaliadores NÃO listados aqui recebem os próximos 10 estudantes não reservados.
+# Avaliadores NÃO listados aqui recebem até 10 estudantes não reservados, priorizando
+# os menos cobertos abaixo de REVIEWS_PER_STUDENT (ver assignments.py).
 USER_STUDENT_RANGES = {
     "taciana.barbosa": range(60, 80),                              # Estudantes 61 a 80
     "gabriel.guerra":  list(range(40, 50)) + list(range(80, 99)), # Estudantes 41-50 e 81-99
@@ -205,15 +223,6 @@ if "profile_complete" not in st.session_state:
     else:
         st.session_state["profile_complete"] = None   # erro de conexão
 
-if st.session_state.get("profile_complete") is True:
-    # Busca e cacheia a posição sequencial do usuário (para distribuição de estudantes)
-    if "user_order" not in st.session_state and st.session_state.logged_user not in ADMIN_USERS:
-        with st.spinner("Carregando sua distribuição de estudantes…"):
-            excluded = list(ADMIN_USERS) + list(USER_STUDENT_RANGES.keys())
-            st.session_state["user_order"] = db.get_user_order_index(
-                st.session_state.logged_user, excluded
-            )
-
 if st.session_state.get("profile_complete") is None:
     st.warning("⚠️ Não foi possível verificar seu cadastro. Verifique sua conexão.")
     if st.button("🔄 Tentar Novamente"):
@@ -361,12 +370,6 @@ if st.session_state["profile_complete"] is False:
                     }
                     if db.save_profile(profile_payload):
                         st.session_state["profile_complete"] = True
-                        # Cacheia a posição sequencial para distribuição de estudantes
-                        if st.session_state.logged_user not in ADMIN_USERS:
-                            excluded = list(ADMIN_USERS) + list(USER_STUDENT_RANGES.keys())
-                            st.session_state["user_order"] = db.get_user_order_index(
-                                st.session_state.logged_user, excluded
-                            )
                         st.success("Perfil salvo! Redirecionando…")
                         st.rerun()
                     else:
@@ -375,89 +378,53 @@ if st.session_state["profile_complete"] is False:
     st.stop()   # bloqueia o app enquanto o perfil não está completo
 
 # ── Funções auxiliares ─────────────────────────────────────────────────────────
-def load_data(file_path):
-    if not os.path.exists(file_path):
-        return []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+@st.cache_resource(max_entries=2, show_spinner="Preparando transcrições…")
+def _load_store_cached(file_path, mtime_ns, size):
+    # Compartilhado entre sessões: compila a exportação se preciso e abre o índice
+    return transcripts.open_store(file_path)
 
 
-def parse_messages(mapping, current_node):
-    messages = []
-    node_id = current_node
-    
-    while node_id:
-        node = mapping.get(node_id)
-        if not node:
-            break
-            
-        msg_obj = node.get('message')
-        if msg_obj and msg_obj.get('author') and msg_obj.get('content'):
-            role = msg_obj['author']['role']
-            content = msg_obj['content'].get('parts', [])
-            create_time = msg_obj.get('create_time') or 0
-            
-            # Filter valid roles and non-empty content
-            if role in ['user', 'assistant']:
-                text = " ".join([str(p) for p in content if p and isinstance(p, str) and str(p).strip()])
-                if text:
-                    messages.append({'role': role, 'text': text, 'time': create_time})
-        
-        node_id = node.get('parent')
-        
-    # Since we traversed from end to start, reverse the list
-    messages.reverse()
-    return messages
+def load_data(file_path):
+    """
+    Abre o armazenamento compilado das transcrições uma única vez por
+    processo. A chave do cache inclui mtime e tamanho do arquivo, então uma
+    nova exportação é recompilada e relida sozinha.
+    """
+    if not os.path.exists(file_path):
+        return None
+    stat = os.stat(file_path)
+    return _load_store_cached(file_path, stat.st_mtime_ns, stat.st_size)
 
 
-def get_student_indices(username: str, total: int):
+def get_student_indices(username: str, total: int, snapshot):
     """
     Distribuição de estudantes por avaliador.
 
     - Admins: veem todos os estudantes.
     - Usuários em USER_STUDENT_RANGES: recebem seu range fixo personalizado.
-    - Demais avaliadores: recebem blocos de 10 dos estudantes NÃO reservados,
-      na ordem em que foram cadastrados (excluindo admins e usuários especiais).
-      A distribuição é CÍCLICA: se acabarem os estudantes, recomeça do 1º grupo.
+    - Demais avaliadores: na ordem de cadastro, mantêm os estudantes que já
+      avaliaram e completam 10 com os estudantes NÃO reservados menos
+      cobertos (avaliações registradas + designações em aberto) que ainda
+      não atingiram REVIEWS_PER_STUDENT (admins e desempatador fora do
+      rodízio).
+
+    A tabela avaliador → estudantes (assignments.py) é compartilhada entre as
+    sessões e só é recalculada quando os perfis do snapshot mudam.
     """
     if username in ADMIN_USERS:
         return list(range(total))
 
-    # Range fixo configurado manualmente
-    if username in USER_STUDENT_RANGES:
-        return list(USER_STUDENT_RANGES[username])
-
-    # ── Calcula os índices disponíveis (não reservados) ────────────────────────
-    reserved = set()
-    for r in USER_STUDENT_RANGES.values():
-        reserved.update(r)
-    available = [i for i in range(total) if i not in reserved]
-
-    if not available:
-        return []
-
-    GROUP_SIZE = 10
-    num_groups = (len(available) + GROUP_SIZE - 1) // GROUP_SIZE
-
-    # Se não está no session_state, tenta buscar (fallback de segurança)
-    # Exclui também os usuários de USER_STUDENT_RANGES do cálculo de ordem
-    excluded = list(ADMIN_USERS) + list(USER_STUDENT_RANGES.keys())
-    if "user_order" not in st.session_state:
-        st.session_state["user_order"] = db.get_user_order_index(
-            username, excluded
+    with st.spinner("Carregando sua distribuição de estudantes…"):
+        indices = assignments.students_for(
+            username, total, OUTSIDE_ROTATION, USER_STUDENT_RANGES, snapshot, REVIEWS_PER_STUDENT,
         )
-
-    user_order = st.session_state.get("user_order", 0)
-    
-    # ── Lógica Cíclica ────────────────────────────────────────────────────────
-    # O operador % garante que se tivermos 8 grupos e o user_order for 8 (9º user),
-    # o group_idx voltará a ser 0 (1º grupo).
-    group_idx = user_order % num_groups
-    
-    start = group_idx * GROUP_SIZE
-    end   = min(start + GROUP_SIZE, len(available))
-
-    return available[start:end]
+    if indices is None:
+        # Sem a ordem de cadastro ou as avaliações não há como saber o grupo do avaliador
+        st.warning("⚠️ Não foi possível carregar sua distribuição de estudantes.")
+        if st.button("🔄 Tentar Novamente", key="retry_assignment"):
+            st.rerun()
+        st.stop()
+    return indices
 
 
 # ── Header + Logout ────────────────────────────────────────────────────────────
@@ -537,15 +504,17 @@ with st.expander("Guia: Os 7 Ds de um Bom Prompt — clique para expandir", expa
     """, unsafe_allow_html=True)
 
 # ── Dados & Distribuição ───────────────────────────────────────────────────────
-data = load_data('conversations.json')
+data = load_data(CONVERSATIONS_FILE)
 
 if not data:
-    st.error("Arquivo 'conversations.json' não encontrado ou vazio.")
+    st.error(f"Arquivo '{CONVERSATIONS_FILE}' não encontrado ou vazio.")
 else:
     st.sidebar.header("Seleção de Estudante")
 
     # Avaliações já feitas por este avaliador
-    all_evals_df = db.get_all_evaluations()
+    # Snapshot das avaliações e dos perfis, renovado com uma única requisição
+    snapshot = db.get_snapshot()
+    all_evals_df, evals_version = snapshot.evaluations, snapshot.version
     evaluated_titles = []
     if not all_evals_df.empty:
         evaluated_titles = (
@@ -558,33 +527,22 @@ else:
     if st.session_state.logged_user == TIEBREAKER_USER:
         filtered_indices = []
         if not all_evals_df.empty:
-            pillars_keys = ['denomine', 'defina', 'descreva', 'de_contexto', 'delimite', 'declare', 'determine']
-            evals_grouped = all_evals_df.groupby('email_original')
-            divergent_titles = set()
-            for title, group in evals_grouped:
-                if len(group) == 2:
-                    row1 = group.iloc[0]
-                    row2 = group.iloc[1]
-                    has_divergence = False
-                    for p in pillars_keys:
-                        if row1.get(p) != row2.get(p):
-                            has_divergence = True
-                            break
-                    if has_divergence:
-                        divergent_titles.add(title)
-            
-            for i, conv in enumerate(data):
-                title = conv.get('title', 'Sem Título')
+            table = agreement.agreement_table(all_evals_df, evals_version)
+            divergent_titles = set(
+                table.index[(table['n_evals'] == 2) & (table['status'] == "Divergente")]
+            )
+
+            for i, title in enumerate(data.titles):
                 if title in divergent_titles:
                     filtered_indices.append(i)
     else:
-        filtered_indices = get_student_indices(st.session_state.logged_user, total_students)
+        filtered_indices = get_student_indices(st.session_state.logged_user, total_students, snapshot)
 
     # Mapa: ID anônimo ↔ índice real
     student_options = []
     id_to_index = {}
 
-    for i, conv in enumerate(data):
+    for i in range(total_students):
         anon_id = f"Estudante {i + 1}"
         id_to_index[anon_id] = i
         if i in filtered_indices:
@@ -599,9 +557,14 @@ else:
         selected_idx = id_to_index[selected_display]
         selected_name = selected_display
 
-        selected_conv = data[selected_idx]
-        selected_student_title = selected_conv.get('title', 'Sem Título')
-        messages = parse_messages(selected_conv.get('mapping', {}), selected_conv.get('current_node'))
+        selected_student_title = data.title(selected_idx)
+        messages = prefetch.messages(data, selected_idx)
+
+        # Enquanto o avaliador lê, decodifica os próximos estudantes da lista
+        # e renova o snapshot de avaliações em segundo plano
+        position = student_options.index(selected_display)
+        upcoming = student_options[position + 1:position + 1 + PREFETCH_AHEAD]
+        prefetch.warm(data, [id_to_index[s] for s in upcoming])
 
         col1, col2 = st.columns([2, 1])
 
@@ -648,7 +611,7 @@ else:
                 is_tiebreaker = (st.session_state.logged_user == TIEBREAKER_USER)
                 previous_evals = []
                 if is_tiebreaker and not all_evals_df.empty:
-                    previous_evals = all_evals_df[all_evals_df['email_original'] == selected_student_title].to_dict('records')
+                    previous_evals = db.get_evaluations_by_title(selected_student_title).to_dict('records')
 
                 for key, label in pillars:
                     db_val = db_eval.get(key, "Pendente") if db_eval else "Pendente"
@@ -709,70 +672,32 @@ else:
         if all_evals_df.empty:
             st.warning("Nenhuma avaliação registrada ainda para gerar o dashboard.")
         else:
+            # Agregados mantidos a cada gravação (sem recalcular sobre a aba inteira)
+            dash = aggregates.dashboard_aggregates(all_evals_df, evals_version)
+
             # Stats Summary
-            total_evals = len(all_evals_df)
-            unique_students = all_evals_df['estudante'].nunique()
-            unique_evaluators = all_evals_df['avaliador'].nunique()
-            
+            summary = dash.summary()
+
             c1, c2, c3 = st.columns(3)
-            c1.metric("Total de Avaliações", total_evals)
-            c2.metric("Estudantes Avaliados", unique_students)
-            c3.metric("Avaliadores Ativos", unique_evaluators)
-            
+            c1.metric("Total de Avaliações", summary["total"])
+            c2.metric("Estudantes Avaliados", summary["students"])
+            c3.metric("Avaliadores Ativos", summary["evaluators"])
+
             st.markdown("---")
-            
+
             # 1. Distribution by Pillar
             st.subheader("Desempenho por Pilar (7 Ds)")
-            
-            pillars_map = {
-                "denomine": "Persona",
-                "defina": "Tarefa",
-                "descreva": "Etapas",
-                "de_contexto": "Contexto",
-                "delimite": "Restrições",
-                "declare": "Objetivo",
-                "determine": "Saída"
-            }
-            
-            p_data = []
-            for col, label in pillars_map.items():
-                counts = all_evals_df[col].value_counts()
-                for status in ["Atendeu", "Parcialmente", "Não Atendeu"]:
-                    p_data.append({
-                        "Pilar": label,
-                        "Status": status,
-                        "Quantidade": counts.get(status, 0)
-                    })
-            
-            chart_df = pd.DataFrame(p_data)
-            chart_pivot = chart_df.pivot(index='Pilar', columns='Status', values='Quantidade')
-            
-            # Garante que as colunas existam na ordem correta para o gráfico ser estável
-            for col in ["Atendeu", "Parcialmente", "Não Atendeu"]:
-                if col not in chart_pivot.columns:
-                    chart_pivot[col] = 0
-            
-            # Reindexa para manter a ordem dos 7 Pilares e do Status
-            chart_pivot = chart_pivot.reindex(list(pillars_map.values()))
-            chart_pivot = chart_pivot[["Atendeu", "Parcialmente", "Não Atendeu"]]
+
+            chart_pivot = dash.status_pivot()
             st.bar_chart(chart_pivot)
-            
+
             st.markdown("---")
-            
+
             # 2. Radar Chart (DNA do Prompt)
             st.subheader("Radar de Competências (Média dos 7 Ds)")
-            
-            # Converter Categorias para Números (Mapeamento de Score)
-            score_map = {"Atendeu": 2, "Parcialmente": 1, "Não Atendeu": 0, "Pendente": 0}
-            
-            radar_data = []
-            for col, label in pillars_map.items():
-                # Calcula a média do score para cada pilar
-                avg_score = all_evals_df[col].map(score_map).mean()
-                radar_data.append({"Pilar": label, "Score": avg_score})
-            
-            df_radar = pd.DataFrame(radar_data)
-            
+
+            df_radar = dash.radar()
+
             fig_radar = go.Figure()
             fig_radar.add_trace(go.Scatterpolar(
                 r=df_radar['Score'].tolist() + [df_radar['Score'].iloc[0]],
@@ -800,15 +725,66 @@ else:
             fig_heatmap = px.imshow(
                 chart_pivot.T,
                 labels=dict(x="Pilar", y="Status", color="Qtd"),
-                x=list(pillars_map.values()),
-                y=["Atendeu", "Parcialmente", "Não Atendeu"],
+                x=list(chart_pivot.index),
+                y=list(chart_pivot.columns),
                 color_continuous_scale="Viridis",
                 text_auto=True
             )
             fig_heatmap.update_layout(height=350, margin=dict(l=20, r=20, t=20, b=20))
             st.plotly_chart(fig_heatmap, use_container_width=True)
+
+            if st.session_state.logged_user in ADMIN_USERS:
+                with st.expander("Conferir agregados (reconstrução completa)"):
+                    if st.button("Verificar agora"):
+                        if dash.verify(all_evals_df):
+                            st.success("Agregados conferem com o snapshot atual.")
+                        else:
+                            st.error("Agregados divergentes do snapshot — reconstruindo.")
+                            dash.refresh(all_evals_df, None)
+                    st.dataframe(dash.evaluator_totals(), use_container_width=True)
+
+                with st.expander("Cobertura da distribuição de estudantes"):
+                    # Da tabela de distribuição em cache e dos agregados: sem leituras extras
+                    coverage = assignments.coverage_table(
+                        total_students, OUTSIDE_ROTATION, USER_STUDENT_RANGES, snapshot, REVIEWS_PER_STUDENT,
+                    )
+                    if coverage is None:
+                        st.warning("Perfis ou avaliações indisponíveis no momento.")
+                    else:
+                        coverage.insert(
+                            1, "Avaliações registradas",
+                            [dash.by_student.get(student, 0) for student in coverage.index],
+                        )
+                        c1, c2, c3 = st.columns(3)
+                        c1.metric("Estudantes sem avaliador designado",
+                                  int((coverage["Avaliadores designados"] == 0).sum()))
+                        c2.metric(f"Com {REVIEWS_PER_STUDENT}+ avaliadores designados",
+                                  int((coverage["Avaliadores designados"] >= REVIEWS_PER_STUDENT).sum()))
+                        c3.metric(f"Com {REVIEWS_PER_STUDENT}+ avaliações registradas",
+                                  int((coverage["Avaliações registradas"] >= REVIEWS_PER_STUDENT).sum()))
+                        st.dataframe(coverage, use_container_width=True)
             
-            # 4. Agrupamento Comparativo por Estudante
+            st.markdown("---")
+
+            # 4. Confiabilidade entre Avaliadores
+            st.subheader("Confiabilidade entre Avaliadores")
+            st.caption(
+                "Concordância observada entre pares de avaliadores, kappa de Cohen "
+                "(1ª × 2ª avaliação), kappa de Fleiss e alfa de Krippendorff ordinal "
+                "(Não Atendeu < Parcialmente < Atendeu). Considera apenas estudantes "
+                "com duas ou mais avaliações."
+            )
+            reliability_df = agreement.reliability_table(all_evals_df, evals_version)
+            st.dataframe(
+                reliability_df.style.format(
+                    {"Concordância (%)": "{:.1f}", "Kappa de Cohen": "{:.3f}",
+                     "Kappa de Fleiss": "{:.3f}", "Alfa de Krippendorff": "{:.3f}"},
+                    na_rep="—",
+                ),
+                use_container_width=True,
+            )
+
+            # 5. Agrupamento Comparativo por Estudante
             st.subheader("Análise Comparativa por Estudante")
             
             # Filtro de Concordância
@@ -822,7 +798,18 @@ else:
                 horizontal=True
             )
             
-            st.info("Clique no (+) abaixo para expandir e comparar as avaliações de cada estudante.")
+            col_modo, col_busca = st.columns([1, 1])
+            with col_modo:
+                modo_exibicao = st.radio(
+                    "Exibição:",
+                    options=["Lista paginada", "Tabela compacta"],
+                    horizontal=True,
+                )
+            with col_busca:
+                busca_estudante = st.text_input(
+                    "Buscar estudante",
+                    placeholder="Ex: 12 ou Estudante 12",
+                ).strip()
 
             # Colunas para exibir dentro de cada bloco (sem repetir o nome do estudante)
             detail_cols = [
@@ -842,53 +829,25 @@ else:
                 'determine':   '7. Saída',
             }
 
-            pillars_keys = ['denomine', 'defina', 'descreva', 'de_contexto', 'delimite', 'declare', 'determine']
-            pillars_names_map = {
-                'denomine':    'Persona',
-                'defina':      'Tarefa',
-                'descreva':    'Etapas',
-                'de_contexto': 'Contexto',
-                'delimite':    'Restrições',
-                'declare':     'Objetivo',
-                'determine':   'Saída',
-            }
-
             # Obtém lista única de estudantes e aplica ordenação natural (numérica)
             def natural_sort_key(s):
                 # Extrai todos os números da string e os transforma em inteiros para ordenar
                 return [int(text) if text.isdigit() else text.lower()
                         for text in re.split(r'(\d+)', str(s))]
 
-            unique_students = sorted(all_evals_df['estudante'].unique(), key=natural_sort_key)
-
-            # Processa e classifica a concordância de todos os estudantes
-            students_processed = []
-            for student in unique_students:
-                group = all_evals_df[all_evals_df['estudante'] == student]
-                n_evals = len(group)
-                
-                divergent_pillars = []
-                if n_evals >= 2:
-                    for k in pillars_keys:
-                        if k in group.columns:
-                            # Se há mais de 1 valor único para este pilar, há divergência
-                            if group[k].nunique() > 1:
-                                divergent_pillars.append(pillars_names_map[k])
-                
-                if n_evals < 2:
-                    status = "Pendente"
-                elif len(divergent_pillars) > 0:
-                    status = "Divergente"
-                else:
-                    status = "Consenso"
-                    
-                students_processed.append({
+            # Classificação de concordância de todos os estudantes (cacheada por snapshot)
+            table = agreement.agreement_table(all_evals_df, evals_version, by='estudante')
+            students_processed = [
+                {
                     'student': student,
-                    'group': group,
-                    'n_evals': n_evals,
-                    'status': status,
-                    'divergent_pillars': divergent_pillars
-                })
+                    'n_evals': row.n_evals,
+                    'status': row.status,
+                    'divergent_pillars': row.divergent_pillars,
+                }
+                for student, row in sorted(
+                    table.iterrows(), key=lambda item: natural_sort_key(item[0])
+                )
+            ]
 
             # Aplica o filtro de concordância
             if filtro_concordancia == "Apenas com Divergências (Avaliadores discordam)":
@@ -898,13 +857,62 @@ else:
             else:
                 students_to_show = students_processed
 
+            # Busca por ID: número exato ("12" → Estudante 12) ou trecho do nome
+            if busca_estudante:
+                if busca_estudante.isdigit():
+                    students_to_show = [
+                        s for s in students_to_show
+                        if re.findall(r'\d+', str(s['student'])) == [str(int(busca_estudante))]
+                    ]
+                else:
+                    busca = busca_estudante.lower()
+                    students_to_show = [s for s in students_to_show if busca in str(s['student']).lower()]
+
             # Exibe os resultados
             if not students_to_show:
                 st.write("Nenhum estudante encontrado com o filtro selecionado.")
+            elif modo_exibicao == "Tabela compacta":
+                # Uma única tabela pré-agregada, com as divergências destacadas
+                compact, divergent_mask = agreement.comparison_table(all_evals_df, evals_version)
+                order = [s['student'] for s in students_to_show]
+                compact = compact.reindex(order)
+                divergent_mask = divergent_mask.reindex(order).fillna(False)
+                compact.insert(0, "Status", [s['status'] for s in students_to_show])
+                compact.insert(1, "Avaliações", [s['n_evals'] for s in students_to_show])
+                compact.index.name = "Estudante"
+
+                def highlight_divergences(frame):
+                    styles = pd.DataFrame("", index=frame.index, columns=frame.columns)
+                    cols = list(divergent_mask.columns)
+                    styles[cols] = divergent_mask[cols].replace(
+                        {True: "background-color: rgba(217,119,6,.25)", False: ""}
+                    )
+                    return styles
+
+                st.dataframe(
+                    compact.style.apply(highlight_divergences, axis=None),
+                    use_container_width=True,
+                )
             else:
-                for s in students_to_show:
+                st.info("Clique no (+) abaixo para expandir e comparar as avaliações de cada estudante.")
+
+                # Paginação no servidor: só os estudantes da página viram elementos
+                col_tam, col_pag = st.columns([1, 1])
+                with col_tam:
+                    page_size = st.selectbox("Estudantes por página", [10, 25, 50], index=0)
+                num_pages = max(1, (len(students_to_show) + page_size - 1) // page_size)
+                with col_pag:
+                    page_num = st.number_input(
+                        f"Página (de {num_pages})", min_value=1, max_value=num_pages, value=1, step=1
+                    )
+                page_start = (int(page_num) - 1) * page_size
+                st.caption(
+                    f"Mostrando {page_start + 1}–{min(page_start + page_size, len(students_to_show))} "
+                    f"de {len(students_to_show)} estudantes."
+                )
+
+                for s in students_to_show[page_start:page_start + page_size]:
                     student = s['student']
-                    group = s['group']
                     n_evals = s['n_evals']
                     status = s['status']
                     divergent_pillars = s['divergent_pillars']
@@ -916,8 +924,13 @@ else:
                         title = f"✅ **{student}** — ({n_evals} avaliações) — Consenso Total"
                     else:
                         title = f"👤 **{student}** — ({n_evals} avaliação) — Aguardando segunda avaliação"
-                        
-                    with st.expander(title):
+
+                    # on_change="rerun": o conteúdo só é montado com o expander aberto
+                    expander = st.expander(title, key=f"cmp_{student}", on_change="rerun")
+                    if not expander.open:
+                        continue
+                    with expander:
+                        group = db.get_evaluations_by_student(student)
                         # Filtra apenas as colunas de interesse existentes
                         existing_cols = [c for c in detail_cols if c in group.columns]
                         df_comparativo = group[existing_cols].rename(columns=col_rename_detail)
@@ -946,5 +959,25 @@ else:
         else:
             st.sidebar.warning("Nenhuma avaliação registrada ainda.")
 
+        # Backend SQLite: situação da fila de envio para o Google Sheets
+        sync = db.sync_status()
+        if sync is not None:
+            pendentes = sum(sync["pending"].values())
+            if sync["last_error"]:
+                st.sidebar.warning(f"Sincronização com o Sheets falhando ({pendentes} pendentes): {sync['last_error']}")
+            elif pendentes:
+                st.sidebar.caption(f"Sincronizando {pendentes} alteração(ões) com o Sheets…")
+            else:
+                st.sidebar.caption("Dados locais sincronizados com o Sheets.")
+
+        # Chamadas à API do Sheets neste processo (limite de taxa e retentativas)
+        metrics = db.sheets_metrics()
+        if metrics:
+            with st.sidebar.expander("Chamadas ao Google Sheets"):
+                st.dataframe(
+                    pd.DataFrame.from_dict(metrics, orient="index").round(2),
+                    use_container_width=True,
+                )
+
     else:
         st.sidebar.info("Exportação restrita a administradores.")
@@ -0,0 +1,195 @@
+"""
+assignments.py — Distribuição de estudantes por avaliador.
+
+A tabela avaliador → índices de estudantes é calculada a partir dos perfis
+do snapshot das abas (`google_sheets.get_snapshot`, ordem de cadastro) e
+compartilhada entre todas as sessões do processo. Ela só é recalculada
+quando `profiles_version` muda — perfil salvo neste processo, ou alterado
+em outra instância e trazido por uma leitura completa das abas ou pelo
+login de quem não estava no diretório. Recalcular a distribuição não custa
+nenhuma leitura extra.
+
+Regras:
+  - usuários em `ranges` (USER_STUDENT_RANGES) recebem seu range fixo, e
+    esses estudantes ficam fora do rodízio;
+  - os demais avaliadores, na ordem de cadastro, mantêm os estudantes que
+    já avaliaram e completam GROUP_SIZE com os estudantes menos cobertos
+    (avaliações registradas + designações em aberto; empate: menor índice)
+    que ainda não atingiram a meta de avaliações por estudante — com a
+    coorte coberta, quem chega depois não recebe estudantes novos;
+  - admins e demais usuários fora do rodízio (ex.: o desempatador) não
+    entram na tabela, e as avaliações deles não contam.
+
+O cálculo é determinístico: os mesmos perfis e avaliações reproduzem a
+mesma tabela. Ao recalculá-la (após reiniciar o processo ou quando os
+perfis mudam), cada avaliador mantém os estudantes que já avaliou; os que ainda não
+avaliou seguem a cobertura do momento e podem dar lugar a estudantes menos
+cobertos se outros avaliadores os avaliaram nesse meio tempo.
+"""
+
+import re
+import threading
+
+import pandas as pd
+
+GROUP_SIZE = 10
+# Meta de avaliações por estudante: a distribuição para de designar um
+# estudante que a atingiu
+DEFAULT_REVIEWS_PER_STUDENT = 2
+
+_STUDENT_ID = re.compile(r"Estudante (\d+)$")
+
+
+def _ranges_key(ranges: dict):
+    return tuple(sorted((user, tuple(indices)) for user, indices in ranges.items()))
+
+
+def evaluated_by_reviewer(df: pd.DataFrame) -> dict:
+    """avaliador → conjunto de índices (base-0) de estudantes que já avaliou."""
+    evaluated = {}
+    if df is None or df.empty or not {"avaliador", "estudante"} <= set(df.columns):
+        return evaluated
+    for reviewer, student in zip(df["avaliador"], df["estudante"]):
+        match = _STUDENT_ID.match(str(student))
+        if match:
+            evaluated.setdefault(reviewer, set()).add(int(match.group(1)) - 1)
+    return evaluated
+
+
+def assign(usernames: list, total: int, admin_users, ranges: dict,
+           evaluated: dict = None, target: int = DEFAULT_REVIEWS_PER_STUDENT) -> pd.DataFrame:
+    """
+    Tabela da distribuição, indexada por `usuario`, com as colunas `ordem`
+    (posição entre os avaliadores do rodízio), `estudantes` (índices
+    base-0) e `ja_avaliados` (quantos deles o avaliador já avaliou).
+
+    A cobertura de um estudante é o número de avaliações registradas
+    (`evaluated`) mais as designações ainda em aberto (avaliadores que o
+    receberam e ainda não o avaliaram). Cada avaliador do rodízio mantém os
+    estudantes que já avaliou e completa GROUP_SIZE com os menos cobertos
+    que ainda não atingiram `target`; atingida a meta, o estudante não é
+    mais designado, e quem chega depois pode receber menos estudantes (ou
+    nenhum).
+
+    `admin_users` são todos os usuários fora do rodízio (admins,
+    desempatador): não entram na tabela, e as avaliações deles não contam.
+    """
+    evaluated = evaluated or {}
+    reserved = set()
+    for r in ranges.values():
+        reserved.update(r)
+    free = [i for i in range(total) if i not in reserved]
+    load = [0] * total   # avaliações registradas + designações em aberto
+    for user, done in evaluated.items():
+        if user not in admin_users:
+            for i in done:
+                if i < total:
+                    load[i] += 1
+
+    rows = {}
+    order = 0
+    for user in usernames:
+        if user in admin_users or user in rows:
+            continue
+        done = evaluated.get(user, set())
+        if user in ranges:
+            students = [i for i in ranges[user] if i < total]
+            rows[user] = (None, students, sum(1 for i in students if i in done))
+        else:
+            # Os já avaliados entraram na cobertura como avaliações registradas
+            pinned = sorted(i for i in done if i < total and i not in reserved)
+            taken = set(pinned)
+            candidates = sorted(
+                (i for i in free if i not in taken and load[i] < target),
+                key=lambda i: (load[i], i),
+            )
+            chosen = candidates[:max(0, GROUP_SIZE - len(pinned))]
+            rows[user] = (order, sorted(pinned + chosen), len(pinned))
+            order += 1
+            for i in chosen:
+                load[i] += 1
+
+    table = pd.DataFrame.from_dict(rows, orient="index", columns=["ordem", "estudantes", "ja_avaliados"])
+    table["ordem"] = table["ordem"].astype("Int64")
+    table.index.name = "usuario"
+    return table
+
+
+def coverage(table: pd.DataFrame, total: int) -> pd.DataFrame:
+    """Por estudante: quantos e quais avaliadores o têm na distribuição."""
+    reviewers = [[] for _ in range(total)]
+    for user, students in table["estudantes"].items():
+        for i in students:
+            reviewers[i].append(user)
+    return pd.DataFrame(
+        {
+            "Avaliadores designados": [len(r) for r in reviewers],
+            "Avaliadores": [", ".join(r) for r in reviewers],
+        },
+        index=pd.Index([f"Estudante {i + 1}" for i in range(total)], name="Estudante"),
+    )
+
+
+class AssignmentTable:
+    """Tabelas de distribuição derivadas dos perfis de uma versão do snapshot."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles_version = None
+        self._tables = {}
+
+    def invalidate(self):
+        """Descarta as tabelas calculadas."""
+        with self._lock:
+            self._profiles_version = None
+            self._tables = {}
+
+    def table(self, total: int, admin_users, ranges: dict, snapshot,
+              target: int = DEFAULT_REVIEWS_PER_STUDENT):
+        """
+        Tabela da distribuição (ver `assign`) para o snapshot das abas, ou
+        None se os perfis não puderem ser lidos (`profiles_version` None).
+        As avaliações do snapshot só são lidas quando a tabela precisa ser
+        calculada — e, se a leitura delas falhou (`version` None), a tabela
+        não é calculada: sem as avaliações, os avaliadores perderiam os
+        estudantes que já avaliaram até a próxima mudança nos perfis.
+        """
+        if snapshot.profiles_version is None:
+            return None
+        with self._lock:
+            if snapshot.profiles_version != self._profiles_version:
+                self._profiles_version = snapshot.profiles_version
+                self._tables = {}
+            key = (total, tuple(admin_users), _ranges_key(ranges), target)
+            if key not in self._tables:
+                if snapshot.version is None:
+                    return None
+                self._tables[key] = assign(
+                    snapshot.profiles["usuario"].tolist(), total, admin_users, ranges,
+                    evaluated_by_reviewer(snapshot.evaluations), target,
+                )
+            return self._tables[key]
+
+    def students_for(self, username: str, total: int, admin_users, ranges: dict, snapshot,
+                     target: int = DEFAULT_REVIEWS_PER_STUDENT):
+        """Índices dos estudantes de `username`, ou None se não for possível determinar."""
+        table = self.table(total, admin_users, ranges, snapshot, target)
+        if table is None or username not in table.index:
+            return None
+        return list(table.at[username, "estudantes"])
+
+
+assignments = AssignmentTable()
+
+
+def students_for(username: str, total: int, admin_users, ranges: dict, snapshot,
+                 target: int = DEFAULT_REVIEWS_PER_STUDENT):
+    """Índices dos estudantes de `username` pela tabela compartilhada (None se indisponível)."""
+    return assignments.students_for(username, total, admin_users, ranges, snapshot, target)
+
+
+def coverage_table(total: int, admin_users, ranges: dict, snapshot,
+                   target: int = DEFAULT_REVIEWS_PER_STUDENT):
+    """Cobertura por estudante da tabela compartilhada (None se perfis ou avaliações não puderem ser lidos)."""
+    table = assignments.table(total, admin_users, ranges, snapshot, target)
+    return None if table is None else coverage(table, total)
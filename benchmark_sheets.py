@@ -0,0 +1,218 @@
+"""
+benchmark_sheets.py — Chamadas ao Google Sheets e tempo por ação do app.
+
+Roda as mesmas sequências de chamadas de `app.py` contra a planilha em
+memória de `fake_sheets.py` (com latência simulada) e mede, para abas com
+100, 1.000 e 10.000 avaliações:
+
+  - login            — perfil, snapshot das abas e distribuição de estudantes
+                       num processo recém-iniciado, e de outro avaliador em
+                       seguida (caches já aquecidos);
+  - rerun            — o que toda interação refaz com o cache válido;
+  - rerun (TTL)      — o mesmo logo após expirar o TTL do snapshot
+                       (verificação de mudanças);
+  - salvar (nova) / salvar (existente) — `save_evaluation` até a
+                       confirmação do lote (inclui a janela da fila);
+  - dashboard        — agregados, concordância, confiabilidade e cobertura,
+                       logo após uma gravação (recalcula) e de novo (cache);
+  - comparação       — só a tabela compacta por estudante da Análise
+                       Comparativa, recalculada (o custo que o Dashboard
+                       paga a cada gravação).
+
+Para cada ação: requisições à API (total e por método), células lidas,
+tempo total e a parte dele gasta esperando o limitador de taxa.
+
+Como usar:
+    python benchmark_sheets.py
+    python benchmark_sheets.py --rows 100 1000 --latency 0.2 --repeat 5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+import streamlit.logger
+
+import aggregates
+import agreement
+import assignments
+import fake_sheets
+import google_sheets as db
+
+PILLARS = ["denomine", "defina", "descreva", "de_contexto", "delimite", "declare", "determine"]
+RESULTS = ["Atendeu", "Parcialmente", "Não Atendeu"]
+ADMIN_USERS = ["admin"]
+# Avaliador cadastrado sem avaliações: a primeira gravação é um append
+USER = "novato"
+
+
+def dataset(n_rows: int, users=(USER,), reviews_per_student: int = 2):
+    """
+    Avaliações sintéticas (cada estudante avaliado por `reviews_per_student`
+    avaliadores) e perfis: `users` primeiro na ordem de cadastro, sem
+    avaliações, seguidos dos avaliadores das linhas geradas. Retorna
+    (avaliações, perfis, nº de estudantes).
+    """
+    n_students = max(1, n_rows // reviews_per_student)
+    # Um estudante aparece em até ⌈n_rows / n_students⌉ linhas, cada uma
+    # de um avaliador diferente
+    n_reviewers = max(-(-n_rows // n_students), n_rows // assignments.GROUP_SIZE)
+    evaluations = []
+    for i in range(n_rows):
+        student = i % n_students
+        reviewer = f"avaliador{(student + i // n_students) % n_reviewers}"
+        title = f"Conversa {student + 1}"
+        row = {
+            "user_key": f"{title}_{reviewer}",
+            "estudante": f"Estudante {student + 1}",
+            "email_original": title,
+            "avaliador": reviewer,
+            "observacoes_col": "",
+            "data_criacao": "2026-05-14 10:00:00",
+        }
+        for k, pillar in enumerate(PILLARS):
+            row[pillar] = RESULTS[(i + k) % len(RESULTS)]
+        evaluations.append(row)
+    assert len({r["user_key"] for r in evaluations}) == n_rows, "user_key repetido"
+    profiles = [
+        {"usuario": user, "nome_completo": user, "idade": 30}
+        for user in list(users) + [f"avaliador{i}" for i in range(n_reviewers)]
+    ]
+    return evaluations, profiles, n_students
+
+
+def spreadsheet(n_rows: int, users=(USER,), **options) -> fake_sheets.FakeSpreadsheet:
+    """Planilha simulada com `dataset(n_rows, users)`; `options` vão para FakeSpreadsheet."""
+    evaluations, profiles, _ = dataset(n_rows, users)
+    return fake_sheets.populate(
+        fake_sheets.FakeSpreadsheet(**options),
+        db.EVAL_HEADERS, db.PROFILE_HEADERS, evaluations, profiles,
+    )
+
+
+def _entry(title: str, student: str, reviewer: str, result: str) -> dict:
+    entry = {
+        "user_key": f"{title}_{reviewer}",
+        "estudante": student,
+        "email_original": title,
+        "avaliador": reviewer,
+        "observacoes_col": "benchmark",
+        "data_criacao": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    entry.update({pillar: result for pillar in PILLARS})
+    return entry
+
+
+# ─── Ações (mesma sequência de chamadas de app.py) ────────────────────────────
+
+def _rerun(total: int, username: str = USER):
+    db.init_sheet()
+    snapshot = db.get_snapshot()
+    assignments.students_for(username, total, ADMIN_USERS, {}, snapshot)
+    db.get_evaluation(f"Conversa 1_{username}")
+    return snapshot
+
+
+def _login(total: int, username: str = USER):
+    db.init_sheet()
+    db.get_profile(username)
+    return _rerun(total, username)
+
+
+def _dashboard(total: int):
+    snapshot = db.get_snapshot()
+    df, version = snapshot.evaluations, snapshot.version
+    dash = aggregates.dashboard_aggregates(df, version)
+    dash.evaluator_totals()
+    agreement.reliability_table(df, version)
+    agreement.agreement_table(df, version, by="estudante")
+    agreement.comparison_table(df, version)
+    assignments.coverage_table(total, ADMIN_USERS, {}, snapshot)
+
+
+def _comparison():
+    agreement.compute_comparison(db.get_snapshot().evaluations)
+
+
+def _measure(sh, fn, *args) -> dict:
+    sh.reset_stats()
+    before = sum(m["wait_s"] for m in db.sheets_metrics().values())
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    waited = sum(m["wait_s"] for m in db.sheets_metrics().values()) - before
+    stats = sh.stats()
+    return {
+        "requisicoes": stats["total"],
+        "metodos": ", ".join(f"{k}×{v}" for k, v in sorted(stats["calls"].items())),
+        "celulas": stats["cells"],
+        "tempo_ms": elapsed * 1000,
+        "espera_ms": waited * 1000,
+    }
+
+
+def run_scenario(n_rows: int, latency: float, per_cell: float) -> list:
+    """Mede cada ação numa planilha nova com `n_rows` avaliações."""
+    total = dataset(n_rows)[2]
+    sh = spreadsheet(n_rows, latency=latency, per_cell=per_cell)
+    db.use_spreadsheet(sh)
+    db.ensure_schema()   # migração de esquema só acontece uma vez na vida da planilha
+    db.use_spreadsheet(sh)
+    assignments.assignments.invalidate()
+
+    steps = [
+        ("login", _login, total),
+        ("login (outro avaliador)", _login, total, "avaliador1"),
+        ("rerun", _rerun, total),
+        ("rerun (TTL)", lambda t: (db.expire_evaluations_cache(), _rerun(t)), total),
+        ("salvar (nova)", db.save_evaluation,
+         _entry("Conversa 1", "Estudante 1", USER, RESULTS[0])),
+        ("salvar (existente)", db.save_evaluation,
+         _entry("Conversa 1", "Estudante 1", USER, RESULTS[1])),
+        ("dashboard", _dashboard, total),
+        ("dashboard (cache)", _dashboard, total),
+        ("comparação", _comparison),
+    ]
+    return [(name, _measure(sh, fn, *args)) for name, fn, *args in steps]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das chamadas ao Google Sheets.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="tamanhos da aba de avaliações")
+    parser.add_argument("--latency", type=float, default=0.15,
+                        help="latência simulada por requisição (s)")
+    parser.add_argument("--per-cell", type=float, default=1e-6,
+                        help="custo simulado por célula lida (s)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="repetições por tamanho (reporta a mediana do tempo)")
+    args = parser.parse_args(argv)
+
+    # Fora do `streamlit run`, cada st.* registraria um aviso de contexto ausente
+    streamlit.logger.set_log_level("error")
+
+    rows = []
+    for n_rows in args.rows:
+        runs = [run_scenario(n_rows, args.latency, args.per_cell) for _ in range(args.repeat)]
+        for i, (name, first) in enumerate(runs[0]):
+            rows.append({
+                "avaliacoes": n_rows,
+                "acao": name,
+                "requisicoes": first["requisicoes"],
+                "celulas": first["celulas"],
+                "tempo_ms": statistics.median(r[i][1]["tempo_ms"] for r in runs),
+                "espera_ms": statistics.median(r[i][1]["espera_ms"] for r in runs),
+                "metodos": first["metodos"],
+            })
+
+    table = pd.DataFrame(rows)
+    with pd.option_context("display.width", 200, "display.max_colwidth", 80):
+        print(table.to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
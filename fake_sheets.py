@@ -0,0 +1,295 @@
+"""
+fake_sheets.py — Planilha do Google Sheets simulada em memória.
+
+Implementa o subconjunto do gspread usado por `google_sheets.py`, com
+latência e cotas simuladas e contagem de chamadas, para medir e testar o
+app sem credenciais nem acesso à rede:
+
+    planilha: get_worksheet, worksheet, add_worksheet, values_batch_get,
+              values_batch_update
+    aba:      title, get_all_records, get_all_values, row_values,
+              col_values, update, batch_update, append_row, append_rows,
+              delete_rows
+
+Cada chamada custa uma requisição: espera `latency` segundos mais
+`per_cell` por célula transferida e conta na cota de leituras ou de
+escritas da planilha (janela deslizante de 60 s, como as cotas por minuto
+da API). Acima da cota a chamada falha com `gspread.exceptions.APIError`
+HTTP 429 e `Retry-After`, sem executar — exatamente o que o executor de
+`google_sheets.py` espera da API real.
+
+Os valores são guardados como texto, como a API os devolve
+(FORMATTED_VALUE).
+
+Como usar:
+    import fake_sheets, google_sheets as db
+    sh = fake_sheets.FakeSpreadsheet(latency=0.15)
+    db.use_spreadsheet(sh)
+    ...
+    print(sh.stats())
+"""
+
+import json
+import threading
+import time
+from collections import Counter, deque
+
+import gspread
+import requests
+from gspread.utils import a1_range_to_grid_range, numericise_all
+
+# Cotas padrão da API por usuário (ver `google_sheets._executor`)
+DEFAULT_QUOTA_PER_MINUTE = 60
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value)
+
+
+def _api_error(status: int, reason: str, message: str,
+               retry_after: float = None) -> gspread.exceptions.APIError:
+    """APIError com a mesma forma da resposta HTTP da API."""
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(
+        {"error": {"code": status, "message": message, "status": reason}}
+    ).encode()
+    if retry_after is not None:
+        response.headers["Retry-After"] = str(int(retry_after + 1))
+    return gspread.exceptions.APIError(response)
+
+
+class FakeWorksheet:
+    """Aba em memória: lista de linhas (listas de texto), linha 1 = cabeçalho."""
+
+    def __init__(self, spreadsheet, title: str, rows: list = None):
+        self._sh = spreadsheet
+        self.title = title
+        self.rows = [[_text(v) for v in row] for row in (rows or [])]
+
+    # ── Leitura ──
+    def get_all_values(self) -> list:
+        return self._sh._request("read", "get_all_values", lambda: [list(r) for r in self.rows])
+
+    def get_all_records(self) -> list:
+        def run():
+            if not self.rows:
+                return []
+            header = self.rows[0]
+            return [
+                dict(zip(header, numericise_all(row + [""] * (len(header) - len(row)),
+                                                default_blank="")))
+                for row in self.rows[1:]
+            ]
+        return self._sh._request("read", "get_all_records", run)
+
+    def row_values(self, row: int) -> list:
+        def run():
+            values = list(self.rows[row - 1]) if row <= len(self.rows) else []
+            while values and values[-1] == "":
+                values.pop()
+            return values
+        return self._sh._request("read", "row_values", run)
+
+    def col_values(self, col: int) -> list:
+        def run():
+            values = [r[col - 1] if col <= len(r) else "" for r in self.rows]
+            while values and values[-1] == "":
+                values.pop()
+            return values
+        return self._sh._request("read", "col_values", run)
+
+    # ── Escrita ──
+    def update(self, values: list, range_name: str = "A1", **kwargs):
+        return self._sh._request("write", "update", lambda: self._write(range_name, values))
+
+    def batch_update(self, data: list, **kwargs):
+        def run():
+            for d in data:
+                self._write(d["range"], d["values"])
+            return {}
+        return self._sh._request("write", "batch_update", run)
+
+    def append_row(self, values: list, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values: list, **kwargs):
+        def run():
+            first = len(self.rows) + 1
+            self.rows.extend([_text(v) for v in row] for row in values)
+            return {"updates": {"updatedRange": f"'{self.title}'!A{first}:A{len(self.rows)}"}}
+        return self._sh._request("write", "append_rows", run)
+
+    def delete_rows(self, start_index: int, end_index: int = None):
+        def run():
+            del self.rows[start_index - 1:(end_index or start_index)]
+            return {}
+        return self._sh._request("write", "delete_rows", run)
+
+    # ── Acesso por intervalo (sem custo de requisição) ──
+    def _read(self, a1: str) -> list:
+        grid = a1_range_to_grid_range(a1)
+        r0, r1 = grid.get("startRowIndex", 0), grid.get("endRowIndex")
+        c0, c1 = grid.get("startColumnIndex", 0), grid.get("endColumnIndex")
+        values = []
+        for row in self.rows[r0:r1]:
+            values.append(row[c0:c1])
+            while values[-1] and values[-1][-1] == "":
+                values[-1].pop()
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def _write(self, a1: str, values: list):
+        grid = a1_range_to_grid_range(a1)
+        r0, c0 = grid.get("startRowIndex", 0), grid.get("startColumnIndex", 0)
+        for i, row in enumerate(values):
+            while len(self.rows) <= r0 + i:
+                self.rows.append([])
+            target = self.rows[r0 + i]
+            if len(target) < c0 + len(row):
+                target.extend([""] * (c0 + len(row) - len(target)))
+            target[c0:c0 + len(row)] = [_text(v) for v in row]
+        return {"updatedRows": len(values)}
+
+
+class FakeSpreadsheet:
+    """
+    Planilha em memória com latência, cotas por minuto e contagem de
+    chamadas. `quota_per_minute=None` desliga a cota.
+    """
+
+    def __init__(self, latency: float = 0.0, per_cell: float = 0.0,
+                 quota_per_minute: int = DEFAULT_QUOTA_PER_MINUTE):
+        self.latency = latency
+        self.per_cell = per_cell
+        self.quota_per_minute = quota_per_minute
+        self._lock = threading.RLock()
+        self._sheets = []
+        self._requests = {"read": deque(), "write": deque()}
+        self.calls = Counter()
+        self.throttled = Counter()
+        self.cells = 0
+        self._add("Página1")
+
+    # ── Abas ──
+    def worksheets(self) -> list:
+        return list(self._sheets)
+
+    def get_worksheet(self, index: int) -> FakeWorksheet:
+        def run():
+            if index >= len(self._sheets):
+                raise gspread.exceptions.WorksheetNotFound(f"index {index} not found")
+            return self._sheets[index]
+        return self._request("read", "get_worksheet", run)
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        def run():
+            for ws in self._sheets:
+                if ws.title == title:
+                    return ws
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self._request("read", "worksheet", run)
+
+    def add_worksheet(self, title: str, rows: int = 1000, cols: int = 26, index: int = None):
+        return self._request("write", "add_worksheet", lambda: self._add(title))
+
+    def _add(self, title: str) -> FakeWorksheet:
+        ws = FakeWorksheet(self, title)
+        with self._lock:
+            self._sheets.append(ws)
+        return ws
+
+    def _by_title(self, title: str) -> FakeWorksheet:
+        for ws in self._sheets:
+            if ws.title == title:
+                return ws
+        raise _api_error(400, "INVALID_ARGUMENT", f"Unable to parse range: {title}")
+
+    def _split(self, range_name: str):
+        title, _, a1 = range_name.rpartition("!")
+        if title.startswith("'") and title.endswith("'"):
+            title = title[1:-1].replace("''", "'")
+        return self._by_title(title), a1
+
+    # ── Intervalos (API de valores) ──
+    def values_batch_get(self, ranges: list, params: dict = None) -> dict:
+        def run():
+            out = []
+            for range_name in ranges:
+                ws, a1 = self._split(range_name)
+                values = ws._read(a1)
+                out.append({"range": range_name, "values": values} if values else {"range": range_name})
+            return {"valueRanges": out}
+        return self._request("read", "values_batch_get", run)
+
+    def values_batch_update(self, body: dict) -> dict:
+        def run():
+            for d in body.get("data", []):
+                ws, a1 = self._split(d["range"])
+                ws._write(a1, d["values"])
+            return {"totalUpdatedRanges": len(body.get("data", []))}
+        return self._request("write", "values_batch_update", run)
+
+    # ── Requisições simuladas ──
+    def _request(self, kind: str, name: str, fn):
+        now = time.monotonic()
+        with self._lock:
+            window = self._requests[kind]
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if self.quota_per_minute is not None and len(window) >= self.quota_per_minute:
+                self.throttled[name] += 1
+                raise _api_error(429, "RESOURCE_EXHAUSTED", f"Quota exceeded for {kind} requests per minute",
+                                 retry_after=60 - (now - window[0]))
+            window.append(now)
+            self.calls[name] += 1
+            result = fn()
+            cells = _count_cells(result)
+            self.cells += cells
+        if self.latency or self.per_cell:
+            time.sleep(self.latency + cells * self.per_cell)
+        return result
+
+    def stats(self) -> dict:
+        """Chamadas por método, total, recusas por cota e células transferidas."""
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "total": sum(self.calls.values()),
+                "throttled": sum(self.throttled.values()),
+                "cells": self.cells,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = Counter()
+            self.throttled = Counter()
+            self.cells = 0
+
+
+def _count_cells(result) -> int:
+    """Células devolvidas por uma leitura (para a latência proporcional ao volume)."""
+    if isinstance(result, dict):
+        return sum(_count_cells(v.get("values", [])) for v in result.get("valueRanges", []))
+    if isinstance(result, list):
+        return sum(len(r) if isinstance(r, (list, dict)) else 1 for r in result)
+    return 0
+
+
+def populate(spreadsheet: FakeSpreadsheet, eval_headers: list, profile_headers: list,
+             evaluations: list = (), profiles: list = ()):
+    """
+    Cria as abas do app (avaliações, perfis) e preenche com `evaluations` e
+    `profiles` (listas de dicts), sem custo de requisição.
+    """
+    sheets = spreadsheet._sheets
+    sheets[0].rows = [list(eval_headers)] + [
+        [_text(r.get(h, "")) for h in eval_headers] for r in evaluations
+    ]
+    if len(sheets) < 2:
+        spreadsheet._add("Perfil Avaliadores")
+    sheets[1].rows = [list(profile_headers)] + [
+        [_text(r.get(h, "")) for h in profile_headers] for r in profiles
+    ]
+    return spreadsheet
@@ -1,51 +1,286 @@
 import os
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import gspread
+import requests
+from google.auth.exceptions import RefreshError, TransportError
+from google.auth.transport.requests import Request
 from google.oauth2.service_account import Credentials
 import pandas as pd
 import streamlit as st
 from datetime import datetime
 
+from local_store import LocalStore, SyncWorker
+from request_executor import RequestExecutor, TokenBucket
+from write_queue import WriteQueue
+
 # ─── Conexão com Google Sheets ────────────────────────────────────────────────
 
-def get_sheet():
-    """Conecta ao Google Sheets e retorna (worksheet_aba1, spreadsheet)."""
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+
+def get_setting(key: str, default):
+    """Lê uma configuração opcional de st.secrets, com valor padrão."""
     try:
-        creds_info = None
-        spreadsheet_id = None
-
-        if "google_sheets" in st.secrets:
-            creds_info = st.secrets["google_sheets"]["credentials"]
-            spreadsheet_id = st.secrets["google_sheets"].get("spreadsheet_id")
-        elif "credentials" in st.secrets:
-            creds_info = st.secrets["credentials"]
-            spreadsheet_id = st.secrets.get("spreadsheet_id")
-
-        if creds_info and spreadsheet_id:
-            info = dict(creds_info)
-            if "private_key" in info:
-                info["private_key"] = info["private_key"].replace("\\n", "\n")
-            creds = Credentials.from_service_account_info(
-                info,
-                scopes=["https://www.googleapis.com/auth/spreadsheets"]
-            )
-        elif os.path.exists("credentials.json"):
-            spreadsheet_id = "1TqWL2Q03uDAtJKkKvA8Hb2fHXwp2GrCpJXk-k1ntgMg"
-            creds = Credentials.from_service_account_file(
-                "credentials.json",
-                scopes=["https://www.googleapis.com/auth/spreadsheets"]
-            )
+        return st.secrets.get(key, default)
+    except Exception:
+        return default
+
+
+def _load_credentials():
+    """Lê as credenciais (st.secrets ou credentials.json) e retorna (creds, spreadsheet_id)."""
+    creds_info = None
+    spreadsheet_id = None
+
+    if "google_sheets" in st.secrets:
+        creds_info = st.secrets["google_sheets"]["credentials"]
+        spreadsheet_id = st.secrets["google_sheets"].get("spreadsheet_id")
+    elif "credentials" in st.secrets:
+        creds_info = st.secrets["credentials"]
+        spreadsheet_id = st.secrets.get("spreadsheet_id")
+
+    if creds_info and spreadsheet_id:
+        info = dict(creds_info)
+        if "private_key" in info:
+            info["private_key"] = info["private_key"].replace("\\n", "\n")
+        creds = Credentials.from_service_account_info(info, scopes=SCOPES)
+    elif os.path.exists("credentials.json"):
+        spreadsheet_id = "1TqWL2Q03uDAtJKkKvA8Hb2fHXwp2GrCpJXk-k1ntgMg"
+        creds = Credentials.from_service_account_file("credentials.json", scopes=SCOPES)
+    else:
+        st.error("Configuração de Google Sheets ausente.")
+        return None, None
+
+    if not spreadsheet_id:
+        st.error("ID da Planilha não encontrado nos segredos.")
+        return None, None
+
+    return creds, spreadsheet_id
+
+
+def _is_auth_error(exc) -> bool:
+    """True se a exceção indica credencial expirada/revogada (exige reconexão)."""
+    if isinstance(exc, RefreshError):
+        return True
+    if isinstance(exc, gspread.exceptions.APIError):
+        return getattr(exc.response, "status_code", None) == 401
+    return False
+
+
+# ─── Executor de Requisições (limite de taxa e retentativas) ──────────────────
+
+# Erros HTTP transitórios: cota excedida ou indisponibilidade momentânea da API
+_TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+
+def _status_code(exc):
+    if isinstance(exc, gspread.exceptions.APIError):
+        return getattr(exc.response, "status_code", None)
+    return None
+
+
+def _is_throttled(exc) -> bool:
+    """True se a API recusou a requisição por cota (HTTP 429)."""
+    return _status_code(exc) == 429
+
+
+def _is_transient(exc) -> bool:
+    """True se o erro costuma passar sozinho (429/5xx ou falha de rede)."""
+    return _status_code(exc) in _TRANSIENT_STATUS or isinstance(
+        exc, (TransportError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    )
+
+
+def _retry_after(exc):
+    """Espera (s) pedida pela API no cabeçalho `Retry-After`, se houver."""
+    if _status_code(exc) is None:
+        return None
+    try:
+        return float(exc.response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+# Cotas padrão da API do Sheets por usuário (a conta de serviço): 60 leituras
+# e 60 escritas por minuto. Configuráveis via `sheets_reads_per_minute` e
+# `sheets_writes_per_minute` em secrets.toml.
+_executor = RequestExecutor(
+    {
+        "read": TokenBucket(float(get_setting("sheets_reads_per_minute", 60)), burst=10),
+        "write": TokenBucket(float(get_setting("sheets_writes_per_minute", 60)), burst=10),
+    },
+    _is_transient,
+    _is_throttled,
+    _retry_after,
+    max_attempts=int(get_setting("sheets_max_attempts", 5)),
+)
+
+_READ_METHODS = {"get_all_records", "get_all_values", "col_values", "row_values", "batch_get"}
+_WRITE_METHODS = {"update", "batch_update", "append_row", "append_rows", "delete_rows"}
+# Repetir estas após um 5xx pode duplicar/remover linhas a mais
+_NON_IDEMPOTENT = {"append_row", "append_rows", "delete_rows"}
+
+
+class _LimitedWorksheet:
+    """Handle de aba cujas chamadas à API passam pelo executor compartilhado."""
+
+    def __init__(self, ws):
+        self._ws = ws
+
+    def __getattr__(self, name):
+        attr = getattr(self._ws, name)
+        if name in _READ_METHODS:
+            kind = "read"
+        elif name in _WRITE_METHODS:
+            kind = "write"
         else:
-            st.error("Configuração de Google Sheets ausente.")
-            return None, None
+            return attr
 
-        if not spreadsheet_id:
-            st.error("ID da Planilha não encontrado nos segredos.")
-            return None, None
+        def call(*args, **kwargs):
+            return _executor.call(kind, name, attr, *args,
+                                  idempotent=name not in _NON_IDEMPOTENT, **kwargs)
+        return call
+
+
+def sheets_metrics() -> dict:
+    """Métricas por tipo de chamada à API (ver `RequestExecutor.metrics`)."""
+    return _executor.metrics()
+
+
+class _SheetsConnection:
+    """
+    Conexão única por processo com o Google Sheets, compartilhada entre todas
+    as sessões do Streamlit.
 
+    Autoriza o cliente e abre a planilha uma única vez; os handles das abas
+    ficam em cache (``get_worksheet`` custa uma leitura de metadados por
+    chamada). O token é renovado quando expira e, se a renovação falhar,
+    a conexão é refeita do zero.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._creds = None
+        self._client = None
+        self._spreadsheet = None
+        self._worksheets = {}
+        self._override = None
+
+    def spreadsheet(self):
+        """Retorna a planilha aberta (conecta ou reconecta se necessário)."""
+        with self._lock:
+            if self._spreadsheet is None:
+                self._connect()
+            else:
+                self._health_check()
+            return self._spreadsheet
+
+    def worksheet(self, index: int, create_title: str = None):
+        """Retorna o handle (cacheado) da aba `index`, criando-a se indicado."""
+        return self._cached(index, "get_worksheet", create_title)
+
+    def worksheet_by_title(self, title: str):
+        """Retorna o handle (cacheado) da aba chamada `title`, criando-a se não existir."""
+        return self._cached(title, "worksheet", title)
+
+    def _cached(self, key, method: str, create_title: str = None):
+        with self._lock:
+            sh = self.spreadsheet()
+            if not sh:
+                return None
+            ws = self._worksheets.get(key)
+            if ws is None:
+                try:
+                    ws = _executor.call("read", method, getattr(sh, method), key)
+                except gspread.exceptions.WorksheetNotFound:
+                    if not create_title:
+                        raise
+                    ws = _executor.call("write", "add_worksheet", sh.add_worksheet,
+                                        title=create_title, rows=500, cols=15, idempotent=False)
+                ws = _LimitedWorksheet(ws)
+                self._worksheets[key] = ws
+            return ws
+
+    def reset(self):
+        """Descarta cliente, planilha e handles — a próxima chamada reconecta."""
+        with self._lock:
+            self._creds = None
+            self._client = None
+            self._spreadsheet = None
+            self._worksheets = {}
+
+    def use(self, spreadsheet):
+        """Usa `spreadsheet` (ex.: fake_sheets.FakeSpreadsheet) no lugar da planilha real."""
+        with self._lock:
+            self.reset()
+            self._override = spreadsheet
+
+    def _connect(self):
+        if self._override is not None:
+            self._spreadsheet = self._override
+            self._worksheets = {}
+            return
+        creds, spreadsheet_id = _load_credentials()
+        if not creds:
+            return
         client = gspread.authorize(creds)
-        sh = client.open_by_key(spreadsheet_id)
-        return sh.get_worksheet(0), sh
+        self._spreadsheet = _executor.call("read", "open_by_key", client.open_by_key, spreadsheet_id)
+        self._client = client
+        self._creds = creds
+        self._worksheets = {}
+
+    def _health_check(self):
+        """Renova o token expirado; reconecta se a credencial não for mais aceita."""
+        if self._creds is None or self._creds.valid:
+            return
+        try:
+            self._creds.refresh(Request())
+        except (RefreshError, TransportError):
+            self.reset()
+            self._connect()
+
+
+_connection = _SheetsConnection()
+
+
+def reset_connection():
+    """Força reconexão no próximo acesso (ex.: após erro de autenticação)."""
+    _connection.reset()
+
+
+def use_spreadsheet(spreadsheet):
+    """
+    Troca o backend por uma planilha em memória (ver fake_sheets.py), sem
+    credenciais, e descarta os caches, as métricas e os limitadores de taxa.
+    Para benchmarks e testes de carga.
+    """
+    global _schema_version, _snapshot
+    _connection.use(spreadsheet)
+    _executor.reset()
+    _schema_version = None
+    _snapshot = None
+    _evaluations.invalidate()
+    _profiles.invalidate()
+
+
+def _handle_error(exc):
+    """Reconecta na próxima chamada se o erro for de autenticação."""
+    if _is_auth_error(exc):
+        reset_connection()
+
+
+def get_sheet():
+    """Retorna (worksheet_aba1, spreadsheet) usando a conexão compartilhada."""
+    try:
+        sh = _connection.spreadsheet()
+        if not sh:
+            return None, None
+        return _connection.worksheet(0), sh
     except Exception as e:
+        _handle_error(e)
         st.error(f"Erro na conexão com Google Sheets: {e}")
         return None, None
 
@@ -53,15 +288,9 @@ def get_sheet():
 def get_profile_sheet():
     """Retorna a aba 'Perfil Avaliadores' (cria se não existir)."""
     try:
-        _, sh = get_sheet()
-        if not sh:
-            return None
-        try:
-            ws2 = sh.get_worksheet(1)
-        except Exception:
-            ws2 = sh.add_worksheet(title="Perfil Avaliadores", rows=500, cols=15)
-        return ws2
+        return _connection.worksheet(1, create_title="Perfil Avaliadores")
     except Exception as e:
+        _handle_error(e)
         st.error(f"Erro ao acessar aba de perfis: {e}")
         return None
 
@@ -87,6 +316,136 @@ PROFILE_HEADERS = [
 NUM_PROFILE_COLS = len(PROFILE_HEADERS)   # 13
 
 
+class _ProfileDirectory:
+    """
+    Diretório de perfis do processo, indexado por `usuario`.
+
+    Guarda os registros na ordem de cadastro e, para cada usuário, a posição
+    (linha da planilha = posição + 2). É carregado com uma única leitura da
+    aba, atualizado no lugar por `save_profile` e substituído a cada leitura
+    completa das abas (ver `prime`). Um usuário que não está no cache
+    provoca uma releitura (perfil cadastrado por outra instância), então o
+    login custa no máximo uma leitura.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._records = None
+        self._positions = {}
+        self.version = 0
+
+    def _load(self, source):
+        self._set(source.get_all_records())
+
+    def _set(self, records: list):
+        positions = {}
+        for i, r in enumerate(records):
+            positions.setdefault(r.get("usuario"), i)
+        self._records = records
+        self._positions = positions
+        self.version += 1
+
+    def lookup(self, source, username: str):
+        """Registro (cópia) de `username`, ou None se não cadastrado."""
+        with self._lock:
+            if self._records is None or username not in self._positions:
+                self._load(source)
+            i = self._positions.get(username)
+            return None if i is None else dict(self._records[i])
+
+    def versioned_records(self, source):
+        """(todos os registros, versão) lidos juntos — a versão muda a cada carga ou gravação."""
+        with self._lock:
+            if self._records is None:
+                self._load(source)
+            return list(self._records), self.version
+
+    def locations(self, usernames):
+        """
+        ({usuario: linha ou None}, próxima_linha) pelo cache, sem acessar a
+        planilha — ou (None, None) se o diretório não está carregado.
+        """
+        with self._lock:
+            if self._records is None:
+                return None, None
+            known = {}
+            for u in usernames:
+                i = self._positions.get(u)
+                known[u] = None if i is None else i + 2
+            return known, len(self._records) + 2
+
+    def apply(self, row: dict):
+        """Aplica um perfil recém-gravado (atualização ou cadastro novo)."""
+        with self._lock:
+            self.version += 1
+            if self._records is None:
+                return
+            i = self._positions.get(row["usuario"])
+            if i is None:
+                self._positions[row["usuario"]] = len(self._records)
+                self._records.append(dict(row))
+            else:
+                self._records[i] = dict(row)
+
+    def prime(self, records: list, version: int):
+        """
+        Substitui os registros pelos baixados junto com a outra aba (leitura
+        completa: traz também perfis editados no lugar por outras
+        instâncias). `version` é a versão do diretório antes do download: se
+        um perfil foi gravado nesse meio tempo, o download é descartado. Não
+        espera pelo lock.
+        """
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            # Mesmos registros: mantém a versão (quem deriva dela não recalcula)
+            if self.version == version and records != self._records:
+                self._set(records)
+        finally:
+            self._lock.release()
+
+    def tail(self):
+        """
+        (quantidade de registros, último `usuario`) carregados, ou None se o
+        diretório não está carregado.
+        """
+        records = self._records   # leitura atômica, sem lock: chamado com o lock das avaliações
+        if records is None:
+            return None
+        return len(records), records[-1].get("usuario") if records else None
+
+    def extend(self, records):
+        """
+        Acrescenta perfis cadastrados por outras instâncias (lidos do fim da
+        aba). Sem esperar o lock; um usuário repetido — ou `records` None
+        (a aba mudou antes do fim) — descarta o diretório.
+        """
+        if records == [] or not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self._records is None:
+                return
+            if records is None:
+                self.invalidate()
+                return
+            for r in records:
+                if r.get("usuario") in self._positions:
+                    self.invalidate()
+                    return
+                self.apply(r)
+        finally:
+            self._lock.release()
+
+    def invalidate(self):
+        with self._lock:
+            self._records = None
+            self._positions = {}
+            self.version += 1
+
+
+_profiles = _ProfileDirectory()
+
+
 def get_profile(username: str):
     """
     Retorna (found, profile_dict):
@@ -94,41 +453,18 @@ def get_profile(username: str):
       - (False, None)  → usuário novo (precisa preencher perfil)
       - (None,  None)  → erro de conexão (ambíguo)
     """
-    ws2 = get_profile_sheet()
+    ws2 = _profile_source()
     if not ws2:
         return None, None
     try:
-        records = ws2.get_all_records()
+        record = _profiles.lookup(ws2, username)
     except Exception as e:
+        _handle_error(e)
         st.warning(f"Não foi possível verificar perfil: {e}")
         return None, None
-    for r in records:
-        if r.get("usuario") == username:
-            return True, r
-    return False, None
-
-
-def get_user_order_index(username: str, admin_users: list) -> int:
-    """
-    Retorna o índice sequencial (0-based) do usuário entre os não-admins,
-    na ordem em que foram cadastrados na planilha.
-      - 1º usuário cadastrado → 0
-      - 2º usuário → 1
-      - etc.
-    Retorna 0 em caso de erro/fallback.
-    """
-    ws2 = get_profile_sheet()
-    if not ws2:
-        return 0
-    try:
-        records = ws2.get_all_records()
-    except Exception:
-        return 0
-    non_admin = [r for r in records if r.get("usuario") not in admin_users]
-    for idx, r in enumerate(non_admin):
-        if r.get("usuario") == username:
-            return idx
-    return 0
+    if record is None:
+        return False, None
+    return True, record
 
 
 def save_profile(profile_data: dict):
@@ -137,33 +473,17 @@ def save_profile(profile_data: dict):
     Campos esperados: usuario, nome_completo, formacao, idade, area_atuacao,
                       sexo, pos_graduacao, experiencia_ia, data_cadastro
     """
-    try:
-        ws2 = get_profile_sheet()
-        if not ws2:
-            return False
-
-        # Garante cabeçalhos corretos
-        col_letter = chr(ord('A') + NUM_PROFILE_COLS - 1)  # 'M'
-        existing_headers = ws2.row_values(1)
-        if not existing_headers or existing_headers != PROFILE_HEADERS:
-            if not existing_headers:
-                ws2.append_row(PROFILE_HEADERS)
-            else:
-                ws2.update([PROFILE_HEADERS], "A1:M1")
-
-        records = ws2.get_all_records()
-        row_data = [profile_data.get(h, "") for h in PROFILE_HEADERS]
-
-        for idx, r in enumerate(records):
-            if r.get("usuario") == profile_data["usuario"]:
-                ws2.update([row_data], f"A{idx + 2}:{col_letter}{idx + 2}")
-                return True
-
-        ws2.append_row(row_data)
-        return True
-    except Exception as e:
-        st.error(f"Erro ao salvar perfil: {e}")
+    row = {h: profile_data.get(h, "") for h in PROFILE_HEADERS}
+    local = _local_backend()
+    if local:
+        saved = _save_local("profiles", row)
+    elif not get_profile_sheet():
         return False
+    else:
+        saved = _submit_write("profiles", row["usuario"], row, "Erro ao salvar perfil")
+    if saved:
+        _profiles.apply(row)
+    return saved
 
 
 # ─── Planilha Principal (Avaliações) ──────────────────────────────────────────
@@ -175,64 +495,1024 @@ EVAL_HEADERS = [
 ]
 
 
+# ─── Esquema da Planilha ──────────────────────────────────────────────────────
+
+# Versão do esquema (cabeçalhos das abas). Aumente ao mudar EVAL_HEADERS ou
+# PROFILE_HEADERS: cada processo reaplica a migração uma única vez.
+#   1 → cabeçalhos das abas de avaliações e de perfis
+#   2 → aba "Controle" com a revisão das alterações no lugar (ver _batch_update)
+SCHEMA_VERSION = 2
+
+# Localizada sempre pelo nome (nunca pela posição): outras abas da planilha
+# não são tocadas
+CONTROL_SHEET = "Controle"
+
+_schema_version = None
+_schema_lock = threading.Lock()
+
+
+def _ensure_headers(ws, headers):
+    """Garante que a linha 1 de `ws` é `headers`."""
+    existing_headers = ws.row_values(1)
+    if existing_headers == headers:
+        return
+    if not existing_headers:
+        ws.append_row(headers)
+    else:
+        ws.update([headers], f"A1:{_last_col(headers)}1")
+
+
+def ensure_schema() -> bool:
+    """
+    Migração do esquema: confere (e corrige) os cabeçalhos das duas abas e
+    cria a aba de controle, uma vez por processo e por SCHEMA_VERSION. Depois disso não custa
+    nenhuma chamada à API. Retorna False se não houver conexão.
+    """
+    global _schema_version
+    if _schema_version == SCHEMA_VERSION:
+        return True
+    with _schema_lock:
+        if _schema_version == SCHEMA_VERSION:
+            return True
+        evaluations = _connection.worksheet(0)
+        profiles = _connection.worksheet(1, create_title="Perfil Avaliadores")
+        control = _connection.worksheet_by_title(CONTROL_SHEET)
+        if not evaluations or not profiles or not control:
+            return False
+        _ensure_headers(evaluations, EVAL_HEADERS)
+        _ensure_headers(profiles, PROFILE_HEADERS)
+        if control.row_values(1)[:1] != ["revisao"]:
+            control.update([["revisao", _new_revision()]], "A1:B1")
+        _schema_version = SCHEMA_VERSION
+        return True
+
+
 def init_sheet():
-    """Garante que o cabeçalho existe na aba 1."""
-    sheet, _ = get_sheet()
-    if not sheet:
+    """
+    Garante o esquema das abas na inicialização do app. Só a primeira
+    chamada do processo acessa a planilha; as demais (a cada rerun) retornam
+    na hora. Com o backend SQLite, a migração fica com a sincronização.
+    """
+    if _local_backend():
+        return True
+    try:
+        return ensure_schema()
+    except Exception as e:
+        _handle_error(e)
+        st.error(f"Erro ao verificar cabeçalhos da planilha: {e}")
         return False
 
-    existing_headers = sheet.row_values(1)
-    if not existing_headers or existing_headers != EVAL_HEADERS:
-        if not existing_headers:
-            sheet.append_row(EVAL_HEADERS)
-        else:
-            sheet.update([EVAL_HEADERS], 'A1:M1')
-    return True
 
+# ─── Cache da Aba de Avaliações ───────────────────────────────────────────────
 
-def save_evaluation(eval_data):
-    """Salva ou atualiza uma avaliação no Google Sheets."""
-    try:
-        sheet, _ = get_sheet()
-        if not sheet:
+# Validade (segundos) do snapshot da aba de avaliações; configurável via
+# `eval_cache_ttl` em secrets.toml.
+DEFAULT_EVAL_CACHE_TTL = 30
+# Idade máxima (segundos) do último download completo: depois dela a
+# verificação barata de mudanças não basta e a aba é baixada inteira (pega
+# edições manuais na interface do Sheets, que não trocam a revisão).
+# Configurável via `eval_full_refresh_max_age` em secrets.toml.
+DEFAULT_EVAL_FULL_REFRESH_MAX_AGE = 300
+
+
+class _EvaluationIndex:
+    """
+    Índices em memória sobre o snapshot de avaliações.
+
+    Guarda rótulos do DataFrame (linha da planilha = rótulo + 2):
+      - user_key       → rótulo (primeira ocorrência)
+      - email_original → [rótulos]
+      - estudante      → [rótulos]
+    """
+
+    GROUP_COLUMNS = ("email_original", "estudante")
+
+    def __init__(self, df: pd.DataFrame):
+        self.by_key = {}
+        self.groups = {col: {} for col in self.GROUP_COLUMNS}
+        if df.empty or "user_key" not in df.columns:
+            return
+        for label, key in zip(df.index, df["user_key"]):
+            self.by_key.setdefault(key, label)
+        for col in self.GROUP_COLUMNS:
+            if col in df.columns:
+                for label, value in zip(df.index, df[col]):
+                    self.groups[col].setdefault(value, []).append(label)
+
+    def add(self, label, row: dict):
+        self.by_key.setdefault(row.get("user_key"), label)
+        for col in self.GROUP_COLUMNS:
+            self.groups[col].setdefault(row.get(col), []).append(label)
+
+    def move(self, label, old_row: dict, new_row: dict):
+        """Atualiza os grupos de uma linha sobrescrita (valores podem mudar)."""
+        for col in self.GROUP_COLUMNS:
+            old, new = old_row.get(col), new_row.get(col)
+            if old == new:
+                continue
+            labels = self.groups[col].get(old, [])
+            if label in labels:
+                labels.remove(label)
+                if not labels:
+                    del self.groups[col][old]
+            self.groups[col].setdefault(new, []).append(label)
+
+
+class _EvaluationStore:
+    """
+    Snapshot da aba de avaliações compartilhado entre sessões (read-through).
+
+    A aba é baixada no máximo uma vez por janela de TTL; escritas feitas por
+    este processo atualizam o snapshot e os índices na hora (o avaliador vê
+    a própria alteração sem esperar o TTL). O DataFrame devolvido nunca é
+    modificado no lugar — cada alteração publica uma cópia nova —, então
+    pode ser lido por várias sessões ao mesmo tempo.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._df = None
+        self._index = None
+        self._fetched_at = 0.0
+        self._full_at = 0.0
+        self._listeners = []
+        self._revision = None
+        self.version = 0
+
+    def subscribe(self, listener):
+        """
+        Registra `listener(old_row, new_row, version)`, chamado a cada linha
+        aplicada por `patch` (`old_row` é None em appends). Downloads
+        completos não notificam: quem assina detecta o salto de versão.
+        """
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def ttl(self) -> float:
+        return float(get_setting("eval_cache_ttl", DEFAULT_EVAL_CACHE_TTL))
+
+    def max_age(self) -> float:
+        return float(get_setting("eval_full_refresh_max_age", DEFAULT_EVAL_FULL_REFRESH_MAX_AGE))
+
+    def snapshot(self, sheet) -> pd.DataFrame:
+        """
+        Retorna o snapshot atual. Ao expirar, tenta primeiro a verificação
+        barata de mudanças (`changes_since` da fonte, se houver): sem
+        alterações no lugar, só as linhas novas são incorporadas; caso
+        contrário — ou se o último download completo tem mais de
+        `max_age()` segundos —, a aba é baixada inteira.
+        """
+        with self._lock:
+            if self._df is None or time.monotonic() - self._fetched_at > self.ttl():
+                if self._df is None or not self._apply_delta(sheet):
+                    df = pd.DataFrame(sheet.get_all_records())
+                    self._index = _EvaluationIndex(df)
+                    self._publish(df)
+                    self._revision = getattr(sheet, "revision", None)
+                    self._full_at = time.monotonic()
+                self._fetched_at = time.monotonic()
+            return self._df
+
+    def _apply_delta(self, sheet) -> bool:
+        """Incorpora as linhas acrescentadas desde o último download; False se não der."""
+        request = self._delta_request(sheet)
+        return request is not None and self._merge_delta(sheet.changes_since(*request))
+
+    def _delta_request(self, sheet):
+        """
+        Argumentos de `changes_since` para o snapshot atual, ou None se a
+        verificação barata não serve (fonte sem suporte, sem revisão ou
+        download completo mais velho que `max_age()`).
+        """
+        if (getattr(sheet, "changes_since", None) is None or self._df is None
+                or self._revision is None or time.monotonic() - self._full_at > self.max_age()):
+            return None
+        last_key = self._df["user_key"].iloc[-1] if len(self._df) else None
+        return self._revision, (len(self._df), last_key), _profiles.tail()
+
+    def _merge_delta(self, delta) -> bool:
+        if delta is None:
             return False
+        rows, profiles = delta
+        if any(row.get("user_key") in self._index.by_key for row in rows):
+            return False   # chave repetida: a aba tem duplicatas, baixa inteira
+        for row in rows:
+            self.patch(row)
+        _profiles.extend(profiles)
+        return True
+
+    def refresh_ahead(self, sheet, margin: float) -> bool:
+        """
+        Renova o snapshot se ele expira em menos de `margin` segundos — pela
+        verificação barata de mudanças quando possível (como `snapshot`),
+        senão baixando a aba inteira. As leituras são feitas fora do lock
+        (leitores continuam com o snapshot atual) e descartadas se uma
+        gravação publicou outra versão nesse meio tempo.
+        """
+        with self._lock:
+            if self._df is not None and self.ttl() - (time.monotonic() - self._fetched_at) > margin:
+                return False
+            version = self.version
+            request = self._delta_request(sheet)
+        if request is not None:
+            delta = sheet.changes_since(*request)
+            with self._lock:
+                if self.version != version:
+                    return False
+                if self._merge_delta(delta):
+                    self._fetched_at = time.monotonic()
+                    return True
+        df = pd.DataFrame(sheet.get_all_records())
+        with self._lock:
+            if self.version != version:
+                return False
+            self._index = _EvaluationIndex(df)
+            self._publish(df)
+            self._revision = getattr(sheet, "revision", None)
+            self._full_at = self._fetched_at = time.monotonic()
+            return True
+
+    def prime(self, records: list, revision, version: int):
+        """
+        Publica registros baixados junto com a outra aba (ver `_BatchSource`),
+        só se o snapshot atual já expirou. `version` é a versão do snapshot
+        antes do download: se uma gravação publicou (ou descartou) outra
+        versão nesse meio tempo, o download é descartado. Não espera pelo
+        lock: se o cache estiver em uso, o download também é descartado.
+        """
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self.version == version and (
+                    self._df is None or time.monotonic() - self._fetched_at > self.ttl()):
+                df = pd.DataFrame(records)
+                self._index = _EvaluationIndex(df)
+                self._publish(df)
+                self._revision = revision
+                self._full_at = self._fetched_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def versioned_snapshot(self, sheet):
+        """(snapshot, versão) lidos juntos — a versão muda a cada download ou gravação."""
+        with self._lock:
+            return self.snapshot(sheet), self.version
+
+    def last_loaded(self):
+        """(snapshot, versão) carregados por último, mesmo expirados — None se nada foi carregado."""
+        with self._lock:
+            return None if self._df is None else (self._df, self.version)
+
+    def is_fresh(self) -> bool:
+        """True se há snapshot carregado dentro do TTL (índice confiável)."""
+        with self._lock:
+            return self._df is not None and time.monotonic() - self._fetched_at <= self.ttl()
+
+    def cached_location(self, user_key):
+        """
+        (linha_existente, próxima_linha) pelo índice em cache, sem acessar a
+        planilha. `linha_existente` é None se a chave ainda não foi gravada.
+        """
+        with self._lock:
+            label = self._index.by_key.get(user_key)
+            return (None if label is None else label + 2), len(self._df) + 2
+
+    def record(self, sheet, user_key):
+        """Registro (dict) de `user_key`, ou None — O(1) pelo índice."""
+        with self._lock:
+            df = self.snapshot(sheet)
+            label = self._index.by_key.get(user_key)
+            return None if label is None else df.loc[label].to_dict()
+
+    def rows_for(self, sheet, column: str, value) -> pd.DataFrame:
+        """Linhas em que `column` (email_original/estudante) vale `value`."""
+        with self._lock:
+            df = self.snapshot(sheet)
+            labels = self._index.groups[column].get(value, [])
+            return df.loc[labels]
+
+    def current_revision(self):
+        """Revisão da aba de controle refletida no snapshot (None se desconhecida)."""
+        with self._lock:
+            return self._revision
+
+    def advance_revision(self, expected, revision):
+        """
+        Adota `revision`, gravada por este processo, se o snapshot ainda
+        reflete `expected` — a próxima verificação de mudanças não a
+        confunde com uma alteração de outra instância.
+        """
+        with self._lock:
+            if expected is not None and self._revision == expected:
+                self._revision = revision
 
-        records = sheet.get_all_records()
-        df = pd.DataFrame(records)
-        row_to_save = [eval_data.get(h, "") for h in EVAL_HEADERS]
+    def expire(self):
+        """Antecipa o fim do TTL: a próxima leitura verifica mudanças."""
+        with self._lock:
+            self._fetched_at = 0.0
 
-        if not df.empty and eval_data['user_key'] in df['user_key'].values:
-            row_idx = df[df['user_key'] == eval_data['user_key']].index[0] + 2
-            sheet.update([row_to_save], f'A{row_idx}:M{row_idx}')
+    def invalidate(self):
+        """Força novo download na próxima leitura (downloads em andamento são descartados)."""
+        with self._lock:
+            self._df = None
+            self._index = None
+            self._revision = None
+            self.version += 1
+
+    def patch(self, row: dict):
+        """Aplica no snapshot uma linha recém-gravada (update ou append)."""
+        with self._lock:
+            if self._df is None:
+                return
+            df = self._df
+            label = self._index.by_key.get(row["user_key"])
+            old_row = None
+            if label is not None:
+                old_row = df.loc[label].to_dict()
+                df = df.copy()
+                for col, value in row.items():
+                    # get_all_records converte números; a coluna precisa aceitar texto
+                    if col in df.columns and not pd.api.types.is_string_dtype(df[col]):
+                        df[col] = df[col].astype(object)
+                    df.loc[label, col] = value
+                self._index.move(label, old_row, row)
+            else:
+                new_row = pd.DataFrame([row], columns=EVAL_HEADERS)
+                df = new_row if df.empty else pd.concat([df, new_row], ignore_index=True)
+                self._index.add(len(df) - 1, row)
+            self._publish(df)
+            for listener in self._listeners:
+                listener(old_row, row, self.version)
+
+    def _publish(self, df: pd.DataFrame):
+        self._df = df
+        self.version += 1
+
+
+_evaluations = _EvaluationStore()
+
+
+def subscribe_evaluations(listener):
+    """Assina as gravações aplicadas ao snapshot (ver `_EvaluationStore.subscribe`)."""
+    _evaluations.subscribe(listener)
+
+
+class PatchListener:
+    """
+    Base dos estados derivados do snapshot mantidos a cada gravação (assine
+    `on_patch` com `subscribe_evaluations`). A subclasse tem `_lock` e
+    `_version` — a versão do snapshot refletida, None para reconstruir na
+    próxima leitura — e implementa `_apply_patch(old_row, new_row)`.
+    """
+
+    def on_patch(self, old_row, new_row, version):
+        """Listener do snapshot: aplica a diferença de uma avaliação salva."""
+        with self._lock:
+            if self._version is None or version != self._version + 1:
+                self._version = None   # perdeu uma atualização → reconstruir na leitura
+                return
+            self._apply_patch(old_row, new_row)
+            self._version = version
+
+
+def expire_evaluations_cache():
+    """Marca o snapshot como expirado (próxima leitura faz a verificação de mudanças)."""
+    _evaluations.expire()
+
+
+# ─── Leitura Conjunta das Abas (uma requisição) ───────────────────────────────
+
+# Snapshot somente leitura das duas abas: `version` muda a cada download ou
+# gravação de avaliações (é a chave de cache dos resultados derivados);
+# `profiles_version`, a cada download ou gravação de perfis.
+Snapshot = namedtuple("Snapshot", ["version", "evaluations", "profiles_version", "profiles"])
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def _records(values: list) -> list:
+    """
+    Linhas de um intervalo (linha 1 = cabeçalho) como dicts, na ordem da
+    planilha, com números convertidos como em `get_all_records`.
+    """
+    if not values:
+        return []
+    return _rows_to_records(values[1:], values[0])
+
+
+def _rows_to_records(rows: list, header: list) -> list:
+    return [
+        dict(zip(header, gspread.utils.numericise_all(row + [""] * (len(header) - len(row)))))
+        for row in rows
+    ]
+
+
+def _new_revision() -> str:
+    return uuid.uuid4().hex
+
+
+def _tables():
+    """(planilha, aba de avaliações, aba de perfis, aba de controle) — erro se sem conexão."""
+    sh = _connection.spreadsheet()
+    if not sh or not ensure_schema():
+        raise RuntimeError("Sem conexão com o Google Sheets.")
+    return (
+        sh,
+        _connection.worksheet(0),
+        _connection.worksheet(1, create_title="Perfil Avaliadores"),
+        _connection.worksheet_by_title(CONTROL_SHEET),
+    )
+
+
+def _batch_get(sh, ranges: list) -> list:
+    """Valores de cada intervalo de `ranges`, numa única requisição."""
+    response = _executor.call("read", "values_batch_get", sh.values_batch_get, ranges)
+    value_ranges = response.get("valueRanges", [])
+    return [
+        value_ranges[i].get("values", []) if i < len(value_ranges) else []
+        for i in range(len(ranges))
+    ]
+
+
+def _fetch_all():
+    """
+    Lê as abas de avaliações e de perfis e a revisão da aba de controle com
+    um único `values_batch_get`. Retorna (avaliações, perfis, revisão).
+    """
+    sh, evaluations, profiles, control = _tables()
+    values = _batch_get(sh, [
+        gspread.utils.absolute_range_name(evaluations.title, f"A:{_last_col(EVAL_HEADERS)}"),
+        gspread.utils.absolute_range_name(profiles.title, f"A:{_last_col(PROFILE_HEADERS)}"),
+        gspread.utils.absolute_range_name(control.title, "B1"),
+    ])
+    return _records(values[0]), _records(values[1]), _cell(values[2])
+
+
+def _cell(values: list):
+    return values[0][0] if values and values[0] else ""
+
+
+def _tail_range(ws, tail, headers) -> str:
+    """Intervalo da última linha conhecida (`tail` = (quantidade, última chave)) até o fim da aba."""
+    return gspread.utils.absolute_range_name(ws.title, f"A{tail[0] + 1}:{_last_col(headers)}")
+
+
+def _tail_rows(values: list, tail, headers):
+    """
+    Linhas depois das conhecidas, ou None se a última linha conhecida não
+    tem mais a chave esperada (linhas removidas ou movidas na planilha).
+    """
+    count, last_key = tail
+    if _cell(values) != str(last_key if count else headers[0]):
+        return None
+    return _rows_to_records(values[1:], headers)
+
+
+def _fetch_changes(revision, evaluation_tail, profile_tail):
+    """
+    Verificação barata de mudanças: numa só requisição lê a revisão e, em
+    cada aba, a última linha conhecida (`*_tail` = (quantidade, última
+    chave); o cabeçalho se não há linhas) e as que vieram depois dela.
+    Retorna None se a revisão mudou ou a última linha de avaliações não é
+    mais a mesma (houve alteração no lugar → baixar tudo), ou (avaliações
+    novas, perfis novos — None se a aba de perfis também mudou).
+    """
+    sh, evaluations, profiles, control = _tables()
+    ranges = [
+        gspread.utils.absolute_range_name(control.title, "B1"),
+        _tail_range(evaluations, evaluation_tail, EVAL_HEADERS),
+    ]
+    if profile_tail is not None:
+        ranges.append(_tail_range(profiles, profile_tail, PROFILE_HEADERS))
+    values = _batch_get(sh, ranges)
+    if _cell(values[0]) != revision:
+        return None
+    new_evaluations = _tail_rows(values[1], evaluation_tail, EVAL_HEADERS)
+    if new_evaluations is None:
+        return None
+    new_profiles = _tail_rows(values[2], profile_tail, PROFILE_HEADERS) if profile_tail is not None else []
+    return new_evaluations, new_profiles
+
+
+class _BatchSource:
+    """
+    Fonte de leitura de uma aba (interface `get_all_records`) que baixa as
+    duas abas na mesma requisição e entrega a outra ao respectivo cache:
+    renovar avaliações e perfis custa uma única ida à API. Também oferece a
+    verificação barata de mudanças (`changes_since`) usada ao expirar o TTL.
+    """
+
+    def __init__(self, table: str):
+        self.table = table
+        self.revision = None
+
+    def get_all_records(self):
+        profiles_version = _profiles.version
+        evaluations_version = _evaluations.version
+        evaluations, profiles, self.revision = _fetch_all()
+        if self.table == "evaluations":
+            _profiles.prime(profiles, profiles_version)
+            return evaluations
+        _evaluations.prime(evaluations, self.revision, evaluations_version)
+        return profiles
+
+    def changes_since(self, revision, evaluation_tail, profile_tail):
+        return _fetch_changes(revision, evaluation_tail, profile_tail)
+
+
+def _profile_records():
+    """
+    (registros, versão) do diretório de perfis — já carregado pela mesma
+    requisição das avaliações, então normalmente sem acessar a planilha.
+    None se os perfis não puderem ser lidos.
+    """
+    source = _profile_source()
+    if not source:
+        return None
+    try:
+        return _profiles.versioned_records(source)
+    except Exception as e:
+        _handle_error(e)
+        st.warning(f"Não foi possível carregar os perfis: {e}")
+        return None
+
+
+def get_snapshot():
+    """
+    Snapshot(version, evaluations, profiles_version, profiles) com as duas
+    abas como DataFrames, renovadas com uma única requisição. É
+    reconstruído só quando uma das abas muda; os DataFrames são
+    compartilhados entre sessões e não devem ser modificados no lugar. Em
+    caso de erro, valem as últimas versões carregadas (ver
+    `get_evaluations_snapshot`); sem nenhuma, os perfis vêm vazios e
+    `profiles_version` é None.
+    """
+    global _snapshot
+    evaluations, version = get_evaluations_snapshot()
+    profiles = _profile_records()
+    with _snapshot_lock:
+        previous = _snapshot
+        if profiles is not None and (previous is None or previous.profiles_version != profiles[1]):
+            profile_frame = pd.DataFrame(profiles[0], columns=PROFILE_HEADERS)
+            profiles_version = profiles[1]
+        elif previous is not None:
+            profile_frame, profiles_version = previous.profiles, previous.profiles_version
         else:
-            sheet.append_row(row_to_save)
+            profile_frame, profiles_version = pd.DataFrame(columns=PROFILE_HEADERS), None
+        if (previous is None or previous.evaluations is not evaluations
+                or previous.version != version or previous.profiles is not profile_frame):
+            _snapshot = Snapshot(version, evaluations, profiles_version, profile_frame)
+        return _snapshot
+
+
+# ─── Fila de Escrita (gravações em lote) ──────────────────────────────────────
+
+# Janela (segundos) em que gravações que chegam durante um envio são
+# agrupadas no próximo (com a fila ociosa o envio é imediato);
+# configurável via `write_batch_window` em secrets.toml.
+DEFAULT_WRITE_WINDOW = 0.5
+# Chamadas de um lote no pior caso: conferência das linhas, batch_update,
+# append e a resolução de appends concorrentes (coluna A, remoção e
+# batch_update)
+WRITE_CALLS_PER_BATCH = 6
+# Margem (s) por chamada para a resposta da API e a espera no limitador
+WRITE_CALL_TIME = 5
+
+_writes = None
+_writes_lock = threading.Lock()
+
+
+def _write_queue() -> WriteQueue:
+    """Fila de escrita única do processo (criada no primeiro uso)."""
+    global _writes
+    with _writes_lock:
+        if _writes is None:
+            _writes = WriteQueue(
+                _flush_writes,
+                window=float(get_setting("write_batch_window", DEFAULT_WRITE_WINDOW)),
+            )
+        return _writes
+
+
+def _write_timeout() -> float:
+    """
+    Quanto quem salvou espera a confirmação: o lote em andamento e o seu,
+    cada um com todas as chamadas esgotando as retentativas do executor,
+    mais a janela de agrupamento. Passado esse tempo a gravação continua
+    na fila e é informada como pendente (ver `_submit_write`).
+    """
+    per_batch = WRITE_CALLS_PER_BATCH * (_executor.max_backoff() + WRITE_CALL_TIME)
+    return 2 * per_batch + _write_queue().window
+
+
+def _last_col(headers) -> str:
+    return gspread.utils.rowcol_to_a1(1, len(headers)).rstrip("1")
+
+
+def _key_rows(ws) -> dict:
+    """Chave (coluna A) → primeira linha em que aparece, lendo só a coluna A."""
+    rows = {}
+    for i, k in enumerate(ws.col_values(1)[1:], start=2):
+        rows.setdefault(k, i)
+    return rows
+
+
+def _appended_row(response) -> int:
+    """Primeira linha efetivamente gravada por um append (de `updates.updatedRange`)."""
+    updated_range = response["updates"]["updatedRange"]
+    first_cell = updated_range.rsplit("!", 1)[-1].split(":")[0]
+    return gspread.utils.a1_to_rowcol(first_cell)[0]
+
+
+def _rows_unchanged(ws, key_rows: dict, keys, revision=None):
+    """
+    Confere, numa única leitura, se cada chave de `keys` com linha conhecida
+    ainda está nessa linha (célula da coluna A). Linhas removidas ou
+    reordenadas — à mão ou por outra instância — deslocam as de baixo.
+
+    Retorna (linhas no lugar, revisão inalterada): na mesma leitura confere
+    se a aba de controle ainda tem `revision` (a revisão conhecida pelo
+    snapshot). Sem linhas conhecidas não há leitura, e a revisão não é
+    conferida.
+    """
+    targets = [(k, key_rows[k]) for k in keys if key_rows.get(k)]
+    if not targets:
+        return True, False
+    ranges = [gspread.utils.absolute_range_name(ws.title, f"A{row}") for _, row in targets]
+    if revision is not None:
+        ranges.append(gspread.utils.absolute_range_name(CONTROL_SHEET, "B1"))
+    values = _batch_get(_connection.spreadsheet(), ranges)
+    unchanged = all(_cell(v) == str(k) for (k, _), v in zip(targets, values))
+    return unchanged, revision is not None and _cell(values[-1]) == revision
+
+
+def _write_batch(ws, headers, rows: list, known: dict = None, expected_row: int = None) -> bool:
+    """
+    Grava `rows` (dicts) numa aba com um `batch_update` para as chaves que já
+    existem e um `append_rows` para as novas. `known` (chave → linha) vem do
+    índice em cache e é conferido antes das atualizações (`_rows_unchanged`);
+    sem ele, ou se as linhas mudaram de lugar, a coluna A é lida uma vez.
+    Se a revisão da aba de controle ainda era a do snapshot de avaliações,
+    a revisão nova gravada com as atualizações passa a ser a dele (não é
+    uma alteração de outra instância).
+
+    Retorna False se o cache estava desatualizado ou se o append caiu fora
+    de `expected_row` (outra instância gravou ao mesmo tempo) — nesse caso
+    as cópias duplicadas já foram resolvidas e o cache deve ser descartado.
+    """
+    revision = _evaluations.current_revision() if known is not None else None
+    stale, same_revision = False, False
+    if known is not None:
+        unchanged, same_revision = _rows_unchanged(ws, known, [r[headers[0]] for r in rows], revision)
+        stale = not unchanged
+    key_rows = _key_rows(ws) if known is None or stale else known
+    last_col = _last_col(headers)
+    updates, appends = [], []
+    for row in rows:
+        values = [row.get(h, "") for h in headers]
+        idx = key_rows.get(row[headers[0]])
+        if idx:
+            updates.append({"range": f"A{idx}:{last_col}{idx}", "values": [values]})
+        else:
+            appends.append(values)
+
+    if updates:
+        new_revision = _batch_update(ws, updates)
+        if same_revision and not stale:
+            _evaluations.advance_revision(revision, new_revision)
+    if not appends:
+        return not stale
+    first_row = _appended_row(ws.append_rows(appends))
+    if stale:
+        return False
+    if expected_row is None or first_row == expected_row:
+        return True
+    _resolve_concurrent_appends(ws, headers, appends, first_row)
+    return False
+
+
+def _resolve_concurrent_appends(ws, headers, appends: list, first_row: int):
+    """
+    O append caiu em linhas diferentes das previstas: outra sessão gravou ao
+    mesmo tempo. Chaves que já existiam numa linha anterior (a mesma
+    avaliação gravada em paralelo) são gravadas nela e a cópia é removida.
+    """
+    key_rows = _key_rows(ws)
+    last_col = _last_col(headers)
+    updates, duplicates = [], []
+    for offset, values in enumerate(appends):
+        appended = first_row + offset
+        earlier = key_rows.get(values[0])
+        if earlier and earlier < appended:
+            updates.append({"range": f"A{earlier}:{last_col}{earlier}", "values": [values]})
+            duplicates.append(appended)
+    for row in sorted(duplicates, reverse=True):   # de baixo para cima: índices não mudam
+        ws.delete_rows(row)
+    if updates:
+        # Depois das remoções: a nova revisão marca também as linhas removidas
+        _batch_update(ws, updates)
+
+
+def _batch_update(ws, updates: list) -> str:
+    """
+    Grava as linhas de `updates` ({range, values} relativos a `ws`) e uma
+    nova revisão na aba de controle, na mesma requisição, e retorna a
+    revisão. Alterações no lugar não aparecem na leitura do fim das abas; a
+    revisão diferente faz os outros processos baixarem tudo de novo.
+    """
+    sh, _, _, control = _tables()
+    revision = _new_revision()
+    data = [
+        {"range": gspread.utils.absolute_range_name(ws.title, u["range"]), "values": u["values"]}
+        for u in updates
+    ]
+    data.append({
+        "range": gspread.utils.absolute_range_name(control.title, "B1"),
+        "values": [[revision]],
+    })
+    _executor.call("write", "values_batch_update", sh.values_batch_update,
+                   {"valueInputOption": "RAW", "data": data})
+    return revision
+
+
+def _flush_writes(table: str, rows: list):
+    """Envia um lote da fila (executado pela thread da fila de escrita)."""
+    try:
+        if table == "profiles":
+            ws = _connection.worksheet(1, create_title="Perfil Avaliadores")
+            if not ws or not ensure_schema():
+                raise RuntimeError("Sem conexão com o Google Sheets.")
+            # Com o diretório carregado, as linhas já são conhecidas (sem ler a coluna A)
+            known, expected_row = _profiles.locations([row["usuario"] for row in rows])
+            if not _write_batch(ws, PROFILE_HEADERS, rows, known, expected_row):
+                _profiles.invalidate()
+            return
+
+        ws = _connection.worksheet(0)
+        if not ws or not ensure_schema():
+            raise RuntimeError("Sem conexão com o Google Sheets.")
+        fresh = _evaluations.is_fresh()
+        known = expected_row = None
+        if fresh:
+            known = {}
+            for row in rows:
+                known[row["user_key"]], expected_row = _evaluations.cached_location(row["user_key"])
+        if fresh and _write_batch(ws, EVAL_HEADERS, rows, known, expected_row):
+            for row in rows:
+                _evaluations.patch(row)
+        else:
+            if not fresh:
+                _write_batch(ws, EVAL_HEADERS, rows)
+            _evaluations.invalidate()
+    except Exception as e:
+        _handle_error(e)
+        # Inclui o perfil aplicado por uma gravação informada como pendente
+        (_profiles if table == "profiles" else _evaluations).invalidate()
+        raise
+
+
+def _submit_write(table: str, key, row: dict, error_message: str) -> bool:
+    """
+    Enfileira a gravação e espera a confirmação do lote. Se ela não chega a
+    tempo (`_write_timeout`), a gravação continua na fila: é informada como
+    pendente, não como falha — salvar de novo só a repetiria.
+    """
+    try:
+        _write_queue().submit(table, key, row).result(timeout=_write_timeout())
+        return True
+    except FutureTimeoutError:
+        st.warning("A gravação está demorando mais que o normal e continua sendo enviada; "
+                   "confira em alguns instantes.")
         return True
     except Exception as e:
-        st.error(f"Erro específico ao salvar: {e}")
+        st.error(f"{error_message}: {e}")
+        return False
+
+
+def save_evaluation(eval_data):
+    """
+    Salva ou atualiza uma avaliação no Google Sheets.
+
+    A gravação entra na fila de escrita do processo: com a fila ociosa ela é
+    enviada na hora; sob carga, avaliações salvas na mesma janela vão juntas
+    num único `batch_update`/append. A função retorna quando o lote é
+    confirmado. Com o índice em cache válido, o lote só confere as células
+    `user_key` das linhas atualizadas; sem ele, lê a coluna `user_key`
+    inteira. Com o backend SQLite, grava localmente e a sincronização fica
+    em segundo plano.
+    """
+    row = {h: eval_data.get(h, "") for h in EVAL_HEADERS}
+    local = _local_backend()
+    if local:
+        return _save_local("evaluations", row)
+
+    sheet, _ = get_sheet()
+    if not sheet:
         return False
+    return _submit_write("evaluations", row["user_key"], row, "Erro específico ao salvar")
+
+
+def prefetch_evaluations():
+    """
+    Renova o snapshot de avaliações se ele já passou da metade do TTL, para
+    que a próxima leitura da página não espere o download. Feito para rodar
+    em segundo plano (não usa st.*; erros são propagados).
+    """
+    local = _local_backend()
+    sheet = local.source("evaluations") if local else _BatchSource("evaluations")
+    _evaluations.refresh_ahead(sheet, _evaluations.ttl() / 2)
+
+
+def _read_error(e):
+    _handle_error(e)
+    st.error(f"Erro ao ler avaliações do Google Sheets: {e}")
 
 
 def get_evaluation(user_key):
     """Recupera uma avaliação pelo user_key."""
-    sheet, _ = get_sheet()
+    sheet = _evaluation_source()
     if not sheet:
         return None
 
-    records = sheet.get_all_records()
-    if not records:
-        return None
+    try:
+        return _evaluations.record(sheet, user_key)
+    except Exception as e:
+        _read_error(e)
+        # Sem a avaliação existente, o formulário abriria em branco e uma
+        # nova gravação sobrescreveria a anterior: interrompe a página.
+        st.stop()
 
-    for record in records:
-        if record.get('user_key') == user_key:
-            return record
-    return None
 
+def get_evaluations_by_title(title: str) -> pd.DataFrame:
+    """Avaliações de um estudante pelo título original da conversa (email_original)."""
+    sheet = _evaluation_source()
+    if not sheet:
+        return pd.DataFrame()
 
-def get_all_evaluations():
-    """Retorna todas as avaliações como DataFrame."""
-    sheet, _ = get_sheet()
+    try:
+        return _evaluations.rows_for(sheet, "email_original", title)
+    except Exception as e:
+        _read_error(e)
+        return pd.DataFrame()
+
+
+def get_evaluations_by_student(student: str) -> pd.DataFrame:
+    """Avaliações de um estudante pelo ID anônimo (coluna estudante)."""
+    sheet = _evaluation_source()
     if not sheet:
         return pd.DataFrame()
 
-    records = sheet.get_all_records()
-    return pd.DataFrame(records)
+    try:
+        return _evaluations.rows_for(sheet, "estudante", student)
+    except Exception as e:
+        _read_error(e)
+        return pd.DataFrame()
+
+
+def _last_snapshot(e):
+    """
+    (DataFrame, versão) do último snapshot carregado quando a renovação
+    falha: um DataFrame vazio distribuiria os estudantes errado e zeraria
+    os selos e o Dashboard. Se nada foi carregado ainda, interrompe a
+    página, como `get_evaluation`.
+    """
+    last = _evaluations.last_loaded()
+    if last is None:
+        _read_error(e)
+        st.stop()
+        return pd.DataFrame(), None   # fora do Streamlit st.stop() não interrompe
+    _handle_error(e)
+    st.warning(f"Não foi possível atualizar as avaliações ({e}); exibindo a última versão carregada.")
+    return last
+
+
+def get_all_evaluations():
+    """
+    Retorna todas as avaliações como DataFrame (snapshot compartilhado em
+    cache — não modifique o objeto retornado no lugar). Se a renovação
+    falhar, devolve o último snapshot carregado (ver `_last_snapshot`).
+    """
+    return get_evaluations_snapshot()[0]
+
+
+def get_evaluations_snapshot():
+    """
+    Retorna (DataFrame, versão) do snapshot de avaliações. A versão permite
+    cachear resultados derivados e recalculá-los só quando os dados mudam.
+    Se a renovação falhar, devolve o último snapshot carregado (ver
+    `_last_snapshot`); a versão só é None fora do Streamlit, sem nenhum.
+    """
+    sheet = _evaluation_source()
+    try:
+        if not sheet:
+            raise RuntimeError("Sem conexão com o Google Sheets.")
+        return _evaluations.versioned_snapshot(sheet)
+    except Exception as e:
+        return _last_snapshot(e)
+
+
+# ─── Armazenamento Local (SQLite) com Sincronização ───────────────────────────
+
+_local = None
+_sync = None
+_local_lock = threading.Lock()
+
+
+def _local_backend():
+    """
+    LocalStore ativo quando `storage_backend = "sqlite"` em secrets.toml
+    (None no modo padrão, direto no Sheets). Na primeira chamada abre o
+    banco, traz os dados da planilha se ele estiver vazio e inicia o worker
+    de sincronização.
+    """
+    global _local, _sync
+    if get_setting("storage_backend", "sheets") != "sqlite":
+        return None
+    with _local_lock:
+        if _local is None:
+            _local = LocalStore(
+                get_setting("local_db_path", "pbic_local.sqlite3"),
+                {"evaluations": ("user_key", EVAL_HEADERS), "profiles": ("usuario", PROFILE_HEADERS)},
+            )
+            if _local.is_empty("evaluations") and _local.is_empty("profiles"):
+                try:
+                    _pull_remote()
+                except Exception as e:
+                    _handle_error(e)   # Sheets fora do ar: segue com o banco vazio
+            _sync = SyncWorker(
+                _push_local_changes,
+                _pull_remote,
+                interval=float(get_setting("sync_interval", 5)),
+                pull_interval=float(get_setting("sync_pull_interval", 60)),
+            )
+            _sync.start()
+        return _local
+
+
+def _evaluation_source():
+    """Fonte de leitura das avaliações: tabela local (SQLite) ou leitura conjunta das abas."""
+    local = _local_backend()
+    if local:
+        return local.source("evaluations")
+    sheet, _ = get_sheet()
+    return _BatchSource("evaluations") if sheet else None
+
+
+def _profile_source():
+    """Fonte de leitura dos perfis: tabela local (SQLite) ou leitura conjunta das abas."""
+    local = _local_backend()
+    if local:
+        return local.source("profiles")
+    return _BatchSource("profiles") if get_profile_sheet() else None
+
+
+def _save_local(table: str, row: dict) -> bool:
+    """Grava no SQLite (milissegundos) e acorda o worker para enviar à planilha."""
+    try:
+        _local.upsert(table, row)
+    except Exception as e:
+        st.error(f"Erro ao salvar localmente: {e}")
+        return False
+    if table == "evaluations":
+        _evaluations.patch(row)
+    _sync.wake()
+    return True
+
+
+def _push_local_changes():
+    """Envia as linhas pendentes do SQLite para as abas (executado pelo worker)."""
+    for table, index, headers in (("evaluations", 0, EVAL_HEADERS),
+                                  ("profiles", 1, PROFILE_HEADERS)):
+        pending = _local.dirty(table)
+        if not pending:
+            continue
+        if not ensure_schema():
+            raise RuntimeError("Sem conexão com o Google Sheets.")
+        ws = _connection.worksheet(index, create_title="Perfil Avaliadores" if index else None)
+        _write_batch(ws, headers, [row for row, _ in pending])
+        _local.mark_clean(table, [(row[headers[0]], updated_at) for row, updated_at in pending])
+
+
+def _pull_remote():
+    """Traz para o SQLite as alterações feitas na planilha por outras instâncias."""
+    evaluations, profiles, _ = _fetch_all()
+    if _local.merge_remote("evaluations", evaluations):
+        _evaluations.invalidate()
+    if _local.merge_remote("profiles", profiles):
+        _profiles.invalidate()
+
+
+def sync_status():
+    """
+    Situação da sincronização (backend SQLite) ou None no modo direto:
+    {"pending": {...}, "last_sync": timestamp, "last_error": str | None}.
+    """
+    if _local_backend() is None:
+        return None
+    return {
+        "pending": _local.pending(),
+        "last_sync": _sync.last_sync,
+        "last_error": _sync.last_error,
+    }
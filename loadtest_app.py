@@ -0,0 +1,302 @@
+"""
+loadtest_app.py — Teste de carga do app com sessões simultâneas.
+
+Simula N avaliadores usando o app ao mesmo tempo, num único processo (como
+o servidor do Streamlit), com o `AppTest` do Streamlit e a planilha em
+memória de `fake_sheets.py` (latência e cotas simuladas). Cada sessão:
+
+    abrir → login → selecionar estudante → salvar avaliação → Dashboard
+
+Cada passo é um rerun do script. Para cada nível de concorrência (por
+padrão 1, 2, 4, 8, 16 sessões) o relatório traz a latência dos reruns
+(p50/p95/p99), a vazão (reruns/s), as requisições à API e as recusas por
+cota. O nível com uma sessão também dá as requisições por ação. A vazão
+satura no nível a partir do qual mais sessões não aumentam mais os reruns
+por segundo (ganho abaixo de `--gain`).
+
+Como usar:
+    python loadtest_app.py
+    python loadtest_app.py --sessions 1 5 10 15 20 --rows 2000 --latency 0.3
+"""
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+import streamlit.logger
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.secrets import Secrets
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.util import patch_config_options
+
+import assignments
+import benchmark_sheets
+import fake_sheets
+import google_sheets as db
+import transcripts
+
+APP_FILE = "app.py"
+# Exportação versionada no repositório (usada se `conversations_file` não
+# estiver configurado)
+DEFAULT_CONVERSATIONS = "conversations 14.05.2026.json"
+ACTIONS = ["abrir", "login", "selecionar", "salvar", "dashboard"]
+
+
+class SessionError(Exception):
+    """O app não chegou ao estado esperado depois de um passo."""
+
+
+@contextmanager
+def concurrent_apptest(secrets: dict):
+    """
+    Permite vários `AppTest.run` ao mesmo tempo. Cada run instala um Runtime
+    simulado, `st.secrets` e a opção `global.appTest` globais e os desfaz ao
+    terminar — o que quebraria as outras sessões ainda em execução. Aqui os
+    segredos e a opção ficam fixos durante todo o teste e o Runtime passa a
+    ser o último instalado, como no servidor, que tem um só. O script também
+    é compilado uma única vez (o servidor tem um só ScriptCache; e
+    `ast.parse` em paralelo falha no Python 3.11).
+    """
+    instance, exists = Runtime.__dict__["instance"], Runtime.__dict__["exists"]
+    get_bytecode = ScriptCache.get_bytecode
+    last = []
+    compiled = {}
+    compile_lock = threading.Lock()
+
+    def shared_instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+        if not last:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last[0]
+
+    def shared_bytecode(self, script_path):
+        with compile_lock:
+            if script_path not in compiled:
+                compiled[script_path] = get_bytecode(self, script_path)
+            return compiled[script_path]
+
+    saved_secrets = st.secrets
+    st.secrets = Secrets()
+    st.secrets._secrets = dict(secrets)
+    Runtime.instance = classmethod(shared_instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(last))
+    ScriptCache.get_bytecode = shared_bytecode
+    try:
+        with patch_config_options({"global.appTest": True}):
+            yield
+    finally:
+        Runtime.instance, Runtime.exists = instance, exists
+        ScriptCache.get_bytecode = get_bytecode
+        st.secrets = saved_secrets
+
+
+class Session:
+    """Um avaliador percorrendo o app; registra a duração de cada rerun."""
+
+    def __init__(self, username: str, spreadsheet, timeout: float):
+        self.username = username
+        self.spreadsheet = spreadsheet
+        self.at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+        self.steps = []   # (ação, segundos, requisições à API, erro)
+
+    def run(self) -> list:
+        for action in ACTIONS:
+            before = self.spreadsheet.stats()["total"]
+            start = time.perf_counter()
+            try:
+                getattr(self, "_" + action)()
+                error = self._exception()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            elapsed = time.perf_counter() - start
+            self.steps.append((action, elapsed, self.spreadsheet.stats()["total"] - before, error))
+            if error:
+                break
+        return self.steps
+
+    def _exception(self):
+        if self.at.exception:
+            return self.at.exception[0].value
+        return None
+
+    # ── Passos ──
+    def _abrir(self):
+        self.at.run()
+
+    def _login(self):
+        self.at.text_input(key="username_input_field").input(self.username)
+        self._button("Entrar").click()
+        self.at.run()
+        if not self.at.sidebar.selectbox:
+            raise SessionError(f"sem lista de estudantes após o login: {self._messages()}")
+
+    def _selecionar(self):
+        select = self.at.sidebar.selectbox[0]
+        select.set_value(select.options[min(1, len(select.options) - 1)])
+        self.at.run()
+
+    def _salvar(self):
+        for radio in self.at.radio:
+            if "Atendeu" in radio.options:
+                radio.set_value("Atendeu")
+        self._button("Salvar Avaliação").click()
+        self.at.run()
+        if not any("salva com sucesso" in s.value for s in self.at.success):
+            raise SessionError(f"avaliação não confirmada: {self._messages()}")
+
+    def _dashboard(self):
+        self.at.sidebar.radio[0].set_value("Dashboard")
+        self.at.run()
+
+    def _messages(self) -> str:
+        """Avisos e erros exibidos pelo app (para o relatório)."""
+        shown = [e.value for e in self.at.error] + [w.value for w in self.at.warning]
+        return "; ".join(shown) or "nenhuma mensagem"
+
+    def _button(self, label: str):
+        for button in self.at.button:
+            if button.label.startswith(label):
+                return button
+        raise SessionError(f"botão '{label}' não encontrado")
+
+
+def run_level(n_sessions: int, args):
+    """
+    Roda `n_sessions` sessões simultâneas numa planilha nova. Retorna (passos
+    de cada sessão, duração total, estatísticas da planilha).
+    """
+    users = [f"sessao{k}" for k in range(n_sessions)]
+    sh = benchmark_sheets.spreadsheet(
+        args.rows, users,
+        latency=args.latency, per_cell=args.per_cell, quota_per_minute=args.quota,
+    )
+    db.use_spreadsheet(sh)
+    assignments.assignments.invalidate()
+
+    secrets = {
+        "conversations_file": args.conversations,
+        # A planilha sintética já cobre cada estudante duas vezes
+        # (benchmark_sheets.dataset): sem folga na meta, a distribuição
+        # não teria estudantes para as sessões
+        "reviews_per_student": 2 + n_sessions,
+    }
+    sessions = [Session(user, sh, args.timeout) for user in users]
+
+    barrier = threading.Barrier(n_sessions)
+
+    def drive(session):
+        barrier.wait()   # todas começam juntas, como numa aula
+        return session.run()
+
+    with concurrent_apptest(secrets):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_sessions) as pool:
+            results = list(pool.map(drive, sessions))
+        wall = time.perf_counter() - start
+    return results, wall, sh.stats()
+
+
+def summarize(n_sessions: int, results: list, wall: float, stats: dict) -> dict:
+    latencies = np.array([s for steps in results for _, s, _, _ in steps]) * 1000
+    errors = [e for steps in results for *_, e in steps if e]
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+    return {
+        "sessoes": n_sessions,
+        "reruns": len(latencies),
+        "erros": len(errors),
+        "tempo_s": wall,
+        "reruns_s": len(latencies) / wall,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "requisicoes": stats["total"],
+        "recusas_429": stats["throttled"],
+    }
+
+
+def per_action(results: list) -> pd.DataFrame:
+    """Requisições à API e duração de cada ação (nível de uma sessão)."""
+    rows = [
+        {"acao": action, "requisicoes": calls, "tempo_ms": seconds * 1000, "erro": error or ""}
+        for steps in results for action, seconds, calls, error in steps
+    ]
+    return pd.DataFrame(rows)
+
+
+def saturation(levels: pd.DataFrame, gain: float):
+    """Primeiro nível cuja vazão não cresce mais que `gain` no nível seguinte (None se não saturou)."""
+    throughput = levels["reruns_s"].tolist()
+    for i in range(len(throughput) - 1):
+        if throughput[i + 1] < throughput[i] * (1 + gain):
+            return levels.iloc[i]
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do app com sessões simultâneas.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="níveis de concorrência")
+    parser.add_argument("--rows", type=int, default=1000,
+                        help="avaliações já existentes na planilha")
+    parser.add_argument("--conversations", default=db.get_setting("conversations_file", DEFAULT_CONVERSATIONS),
+                        help="exportação das conversas usada pelo app")
+    parser.add_argument("--latency", type=float, default=0.15,
+                        help="latência simulada por requisição (s)")
+    parser.add_argument("--per-cell", type=float, default=1e-6,
+                        help="custo simulado por célula lida (s)")
+    parser.add_argument("--quota", type=int, default=fake_sheets.DEFAULT_QUOTA_PER_MINUTE,
+                        help="cota simulada de leituras/escritas por minuto")
+    parser.add_argument("--timeout", type=float, default=120,
+                        help="tempo máximo de um rerun (s)")
+    parser.add_argument("--gain", type=float, default=0.10,
+                        help="ganho mínimo de vazão para considerar que não saturou")
+    args = parser.parse_args(argv)
+
+    store = transcripts.open_store(args.conversations)
+    if store is None:
+        print(f"Arquivo de conversas não encontrado: '{args.conversations}' (use --conversations).")
+        return 2
+    store.close()
+
+    # Fora do `streamlit run`, cada st.* registraria um aviso de contexto ausente
+    streamlit.logger.set_log_level("error")
+
+    levels, actions = [], None
+    for n_sessions in sorted(set(args.sessions)):
+        results, wall, stats = run_level(n_sessions, args)
+        levels.append(summarize(n_sessions, results, wall, stats))
+        print(f"{n_sessions:>3} sessões: {levels[-1]['reruns']} reruns em {wall:.1f} s", flush=True)
+        if n_sessions == 1:
+            actions = per_action(results)
+        for steps in results:
+            for action, _, _, error in steps:
+                if error:
+                    print(f"    erro em '{action}': {error}")
+
+    table = pd.DataFrame(levels)
+    fmt = {"float_format": lambda v: f"{v:.1f}", "index": False}
+    if actions is not None:
+        print("\nRequisições à API por ação (uma sessão):")
+        print(actions.to_string(**fmt))
+    print("\nLatência dos reruns e vazão por nível de concorrência:")
+    print(table.to_string(**fmt))
+
+    point = saturation(table, args.gain)
+    if point is None:
+        print(f"\nA vazão ainda cresce com {table['sessoes'].iloc[-1]} sessões (não saturou).")
+    else:
+        print(f"\nA vazão satura em ~{int(point['sessoes'])} sessões "
+              f"({point['reruns_s']:.1f} reruns/s; p95 {point['p95_ms']:.0f} ms).")
+    return 0 if not table["erros"].any() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
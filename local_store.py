@@ -0,0 +1,207 @@
+"""
+local_store.py — Armazenamento local (SQLite) com sincronização em segundo
+plano para o Google Sheets.
+
+Com `storage_backend = "sqlite"` em secrets.toml, avaliações e perfis são
+gravados primeiro num banco SQLite local (modo WAL) e a gravação retorna em
+milissegundos. Um worker em segundo plano envia as linhas pendentes
+("dirty") para as abas existentes da planilha, com retentativas e backoff
+exponencial, e periodicamente traz as alterações feitas por outras
+instâncias. Se o Sheets ficar fora do ar, o app continua funcionando com
+os dados locais e a fila é enviada quando a conexão voltar.
+
+Este módulo não conhece o Google Sheets: as funções de envio/recebimento
+são injetadas por `google_sheets.py`.
+"""
+
+import random
+import sqlite3
+import threading
+import time
+
+
+class _TableSource:
+    """Adaptador com a mesma interface de leitura de uma worksheet (`get_all_records`)."""
+
+    def __init__(self, store, table):
+        self._store = store
+        self._table = table
+
+    def get_all_records(self):
+        return self._store.records(self._table)
+
+
+class LocalStore:
+    """
+    Banco SQLite local. `tables` mapeia nome da tabela → (coluna chave,
+    lista de colunas), ex.: {"evaluations": ("user_key", EVAL_HEADERS)}.
+    Cada tabela ganha as colunas de controle `_dirty` e `_updated_at`; a
+    ordem de inserção (rowid) preserva a ordem de cadastro da planilha.
+    """
+
+    def __init__(self, path: str, tables: dict):
+        self.path = path
+        self.tables = tables
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for table, (key, columns) in tables.items():
+            cols = ", ".join(
+                f'"{c}" TEXT PRIMARY KEY' if c == key else f'"{c}"' for c in columns
+            )
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table}" '
+                f'({cols}, "_dirty" INTEGER NOT NULL DEFAULT 0, "_updated_at" REAL NOT NULL DEFAULT 0)'
+            )
+
+    def source(self, table: str) -> _TableSource:
+        return _TableSource(self, table)
+
+    def records(self, table: str) -> list:
+        """Todas as linhas de `table`, na ordem de inserção, como dicts."""
+        _, columns = self.tables[table]
+        cols = ", ".join(f'"{c}"' for c in columns)
+        with self._lock:
+            rows = self._conn.execute(f'SELECT {cols} FROM "{table}" ORDER BY rowid').fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def is_empty(self, table: str) -> bool:
+        with self._lock:
+            return self._conn.execute(f'SELECT 1 FROM "{table}" LIMIT 1').fetchone() is None
+
+    def upsert(self, table: str, row: dict, dirty: bool = True):
+        """Grava (insere ou atualiza) uma linha; `dirty` a coloca na fila de envio."""
+        key, columns = self.tables[table]
+        cols = ", ".join(f'"{c}"' for c in columns)
+        marks = ", ".join("?" for _ in columns)
+        updates = ", ".join(f'"{c}" = excluded."{c}"' for c in columns if c != key)
+        with self._lock:
+            self._conn.execute(
+                f'INSERT INTO "{table}" ({cols}, "_dirty", "_updated_at") VALUES ({marks}, ?, ?) '
+                f'ON CONFLICT("{key}") DO UPDATE SET {updates}, '
+                f'"_dirty" = excluded."_dirty", "_updated_at" = excluded."_updated_at"',
+                [row.get(c, "") for c in columns] + [int(dirty), time.time()],
+            )
+
+    def dirty(self, table: str) -> list:
+        """Linhas pendentes de envio: lista de (dict, _updated_at)."""
+        _, columns = self.tables[table]
+        cols = ", ".join(f'"{c}"' for c in columns)
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT {cols}, "_updated_at" FROM "{table}" WHERE "_dirty" = 1 ORDER BY rowid'
+            ).fetchall()
+        return [(dict(zip(columns, row[:-1])), row[-1]) for row in rows]
+
+    def pending(self) -> dict:
+        """Quantidade de linhas pendentes por tabela."""
+        with self._lock:
+            return {
+                table: self._conn.execute(
+                    f'SELECT COUNT(*) FROM "{table}" WHERE "_dirty" = 1'
+                ).fetchone()[0]
+                for table in self.tables
+            }
+
+    def mark_clean(self, table: str, sent: list):
+        """
+        Marca como enviadas as linhas `sent` = [(chave, _updated_at)]. Uma
+        linha alterada de novo durante o envio continua pendente.
+        """
+        key, _ = self.tables[table]
+        with self._lock:
+            self._conn.executemany(
+                f'UPDATE "{table}" SET "_dirty" = 0 WHERE "{key}" = ? AND "_updated_at" = ?',
+                sent,
+            )
+
+    def merge_remote(self, table: str, records: list) -> int:
+        """
+        Incorpora linhas vindas da planilha, sem sobrescrever alterações
+        locais ainda não enviadas. Retorna quantas linhas mudaram.
+
+        Tudo numa única transação, e a condição `_dirty = 0` fica no próprio
+        UPSERT: uma gravação local que chegue durante o merge nunca é
+        sobrescrita nem marcada como enviada.
+        """
+        key, columns = self.tables[table]
+        cols = ", ".join(f'"{c}"' for c in columns)
+        marks = ", ".join("?" for _ in columns)
+        updates = ", ".join(f'"{c}" = excluded."{c}"' for c in columns if c != key)
+        # A planilha converte números; compara como texto para não reenviar à toa
+        differs = " OR ".join(
+            f'CAST("{c}" AS TEXT) IS NOT CAST(excluded."{c}" AS TEXT)' for c in columns if c != key
+        )
+        now = time.time()
+        rows = [
+            [record.get(c, "") for c in columns] + [now]
+            for record in records if record.get(key)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.executemany(
+                    f'INSERT INTO "{table}" ({cols}, "_dirty", "_updated_at") VALUES ({marks}, 0, ?) '
+                    f'ON CONFLICT("{key}") DO UPDATE SET {updates}, "_updated_at" = excluded."_updated_at" '
+                    f'WHERE "_dirty" = 0 AND ({differs})',
+                    rows,
+                )
+                changed = cursor.rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return changed
+
+
+class SyncWorker(threading.Thread):
+    """
+    Thread de sincronização: a cada `interval` segundos (ou ao ser acordada
+    por `wake`) chama `push()`; a cada `pull_interval` chama `pull()`. Falhas
+    aumentam a espera com backoff exponencial com jitter, até `max_backoff`.
+    """
+
+    def __init__(self, push, pull, interval: float = 5.0, pull_interval: float = 60.0,
+                 max_backoff: float = 300.0):
+        super().__init__(name="pbic-sync", daemon=True)
+        self._push = push
+        self._pull = pull
+        self.interval = interval
+        self.pull_interval = pull_interval
+        self.max_backoff = max_backoff
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._next_pull = 0.0
+        self.failures = 0
+        self.last_error = None
+        self.last_sync = None
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        delay = 0.0
+        while not self._stopping.is_set():
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stopping.is_set():
+                break
+            try:
+                self._push()
+                if time.monotonic() >= self._next_pull:
+                    self._pull()
+                    self._next_pull = time.monotonic() + self.pull_interval
+                self.failures = 0
+                self.last_error = None
+                self.last_sync = time.time()
+                delay = self.interval
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                backoff = min(self.max_backoff, self.interval * 2 ** self.failures)
+                delay = backoff * random.uniform(0.5, 1.0)
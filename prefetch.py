@@ -0,0 +1,93 @@
+"""
+prefetch.py — Pré-carregamento dos próximos estudantes na página de Avaliação.
+
+Enquanto o avaliador lê a conversa atual, uma pequena pool de threads
+decodifica as transcrições dos próximos estudantes da sua lista e renova o
+snapshot de avaliações se ele estiver para expirar. Ao trocar de estudante,
+a conversa já está decodificada em memória e a avaliação existente sai do
+cache, sem esperar a planilha.
+
+A pool e o cache são compartilhados entre as sessões do processo.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import google_sheets as db
+
+# Quantas transcrições decodificadas ficam em memória (todas as sessões)
+CACHE_SIZE = 64
+
+
+class Prefetcher:
+    """Cache LRU de transcrições decodificadas, preenchido em segundo plano."""
+
+    def __init__(self, workers: int = 2, cache_size: int = CACHE_SIZE):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pbic-prefetch")
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()   # (store, índice) → mensagens
+        self._pending = {}            # (store, índice) → Future
+        self._evaluations = None      # Future da renovação do snapshot
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def messages(self, store, idx: int) -> list:
+        """Mensagens do estudante `idx`, do cache se já pré-carregadas."""
+        key = (store, idx)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            future = self._pending.get(key)
+        if future is not None:
+            self.hits += 1
+            return future.result()
+        self.misses += 1
+        return self._load(store, idx)
+
+    def warm(self, store, indices):
+        """Agenda a decodificação de `indices` e a renovação do snapshot de avaliações."""
+        with self._lock:
+            for idx in indices:
+                key = (store, idx)
+                if key not in self._cache and key not in self._pending:
+                    self._pending[key] = self._pool.submit(self._load, store, idx)
+            if self._evaluations is None or self._evaluations.done():
+                self._evaluations = self._pool.submit(self._warm_evaluations)
+
+    def _load(self, store, idx: int) -> list:
+        key = (store, idx)
+        try:
+            messages = store.messages(idx)
+            with self._lock:
+                self._cache[key] = messages
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            return messages
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    @staticmethod
+    def _warm_evaluations():
+        try:
+            db.prefetch_evaluations()
+        except Exception:
+            pass   # a leitura normal da página tenta de novo e mostra o erro
+
+
+prefetcher = Prefetcher()
+
+
+def messages(store, idx: int) -> list:
+    """Mensagens do estudante `idx` (ver `Prefetcher.messages`)."""
+    return prefetcher.messages(store, idx)
+
+
+def warm(store, indices):
+    """Pré-carrega os estudantes `indices` em segundo plano."""
+    prefetcher.warm(store, indices)
@@ -0,0 +1,165 @@
+"""
+request_executor.py — Executor compartilhado das chamadas ao Google Sheets.
+
+Toda requisição à API passa por aqui:
+
+  - limite de taxa no cliente (token bucket) separado para leituras e
+    escritas, ajustado às cotas por minuto da API do Sheets: um pico de
+    acessos vira uma pequena espera em vez de um HTTP 429;
+  - retentativas com backoff exponencial com jitter para erros transitórios
+    (429/5xx/rede), respeitando `Retry-After` quando a API o envia;
+  - orçamento de retentativas do processo: as retentativas ficam limitadas
+    a uma fração das requisições, para não multiplicar a carga quando a API
+    está realmente fora do ar;
+  - métricas por tipo de chamada (quantidade, erros, retentativas, espera
+    no limitador e tempo de resposta).
+"""
+
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """Limitador de taxa: `rate_per_minute` requisições, com rajadas de até `burst`."""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def refill(self):
+        """Volta ao balde cheio (ex.: ao trocar de planilha/conta)."""
+        with self._lock:
+            self._tokens = self.capacity
+            self._updated = time.monotonic()
+
+    def acquire(self) -> float:
+        """Consome uma ficha, esperando se preciso. Retorna os segundos esperados."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class RetryBudget:
+    """
+    Orçamento de retentativas: cada requisição bem-sucedida deposita `ratio`
+    fichas e cada retentativa gasta uma, com saldo máximo `reserve`.
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: float = 10.0):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._tokens = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.reserve, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RequestExecutor:
+    """
+    Executa chamadas com limite de taxa, retentativas e métricas.
+
+    `is_transient(exc)` diz se o erro pode ser repetido; `is_throttled(exc)`
+    se a API recusou a requisição sem executá-la (429). Chamadas não
+    idempotentes (append, delete) só são repetidas no segundo caso, para não
+    duplicar linhas quando o resultado de um 5xx é incerto. `retry_after(exc)`
+    devolve a espera pedida pela API, ou None.
+    """
+
+    def __init__(self, buckets: dict, is_transient, is_throttled, retry_after=None,
+                 max_attempts: int = 5, base_delay: float = 1.0, max_delay: float = 32.0,
+                 budget: RetryBudget = None):
+        self.buckets = buckets
+        self._is_transient = is_transient
+        self._is_throttled = is_throttled
+        self._retry_after = retry_after or (lambda exc: None)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def call(self, kind: str, name: str, fn, *args, idempotent: bool = True, **kwargs):
+        """Executa `fn(*args, **kwargs)` como uma requisição `kind` ("read"/"write")."""
+        attempt = 0
+        while True:
+            waited = self.buckets[kind].acquire()
+            start = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                elapsed = time.monotonic() - start
+                retry = (
+                    attempt + 1 < self.max_attempts
+                    and (self._is_throttled(exc) or (idempotent and self._is_transient(exc)))
+                    and self.budget.withdraw()
+                )
+                self._record(name, elapsed, waited, error=not retry, retried=retry)
+                if not retry:
+                    raise
+                backoff = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+                time.sleep(max(backoff, self._retry_after(exc) or 0))
+                attempt += 1
+                continue
+            self._record(name, time.monotonic() - start, waited)
+            self.budget.deposit()
+            return result
+
+    def max_backoff(self) -> float:
+        """
+        Maior espera somada entre as tentativas de uma chamada (todas as
+        retentativas esgotadas, sem jitter). `Retry-After` pode pedir mais.
+        """
+        return sum(min(self.max_delay, self.base_delay * 2 ** attempt)
+                   for attempt in range(self.max_attempts - 1))
+
+    def _record(self, name, elapsed, waited, error=False, retried=False):
+        with self._lock:
+            m = self._metrics.setdefault(name, {
+                "calls": 0, "errors": 0, "retries": 0,
+                "wait_s": 0.0, "time_s": 0.0, "max_s": 0.0,
+            })
+            m["calls"] += 1
+            m["errors"] += int(error)
+            m["retries"] += int(retried)
+            m["wait_s"] += waited
+            m["time_s"] += elapsed
+            m["max_s"] = max(m["max_s"], elapsed)
+
+    def metrics(self) -> dict:
+        """Cópia das métricas acumuladas: {chamada: {calls, errors, retries, wait_s, time_s, max_s}}."""
+        with self._lock:
+            return {name: dict(m) for name, m in self._metrics.items()}
+
+    def reset_metrics(self):
+        with self._lock:
+            self._metrics = {}
+
+    def reset(self):
+        """Zera métricas, limitadores e orçamento de retentativas."""
+        for bucket in self.buckets.values():
+            bucket.refill()
+        self.budget = RetryBudget(self.budget.ratio, self.budget.reserve)
+        self.reset_metrics()
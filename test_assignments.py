@@ -0,0 +1,77 @@
+import pandas as pd
+
+import assignments
+import google_sheets as db
+from assignments import GROUP_SIZE, assign
+
+ADMINS = ["admin"]
+TIEBREAKER = "desempate"
+
+
+def _sets(table):
+    return {user: list(students) for user, students in table["estudantes"].items()}
+
+
+def test_students_at_target_are_not_assigned():
+    evaluated = {"fora": {0, 1}, "outro": {0}}
+    table = assign(["a", "b", "c", "d"], 12, ADMINS, {}, evaluated, target=2)
+    sets = _sets(table)
+    assert 0 not in sum(sets.values(), [])   # 2 avaliações registradas
+    assert sets["a"] == list(range(2, 12))   # 1 já tem uma: fica para depois
+    assert sets["b"] == list(range(1, 11))
+    assert sets["c"] == [11]
+    assert sets["d"] == []                   # coorte coberta
+
+
+def test_pinned_students_are_kept_beyond_the_target():
+    evaluated = {"x": {0}, "y": {0}, "a": {0}}
+    table = assign(["a"], 5, ADMINS, {}, evaluated, target=2)
+    assert _sets(table)["a"] == [0, 1, 2, 3, 4]
+    assert table.at["a", "ja_avaliados"] == 1
+
+
+def test_reviewers_keep_their_sets_when_the_tiebreaker_leaves_the_ordering():
+    users = ["r0", "r1", TIEBREAKER, "r2", "r3"]
+    before = _sets(assign(users, 30, ADMINS, {}, {}, target=2))
+    evaluated = {user: set(before[user][:4]) for user in ("r0", "r1", "r2", "r3")}
+    evaluated[TIEBREAKER] = {0, 10}
+
+    after = _sets(assign(users, 30, ADMINS + [TIEBREAKER], {}, evaluated, target=2))
+    assert TIEBREAKER not in after
+    for user in ("r0", "r1"):   # cadastrados antes do desempatador: nada muda
+        assert after[user] == before[user]
+    for user in ("r2", "r3"):   # depois dele: os já avaliados continuam
+        assert evaluated[user] <= set(after[user])
+        assert len(after[user]) == GROUP_SIZE
+
+
+def test_rebuild_reproduces_the_table():
+    users = ["a", "b", "c", "d"]
+    evaluated = {"a": {0, 3}, "c": {25}}
+    first = assign(users, 30, ADMINS, {"d": range(20, 25)}, evaluated)
+    again = assign(users + ["e"], 30, ADMINS, {"d": range(20, 25)}, evaluated)
+    for user in users:
+        assert list(again.at[user, "estudantes"]) == list(first.at[user, "estudantes"])
+    assert not set(first.at["a", "estudantes"]) & set(range(20, 25))
+
+
+def _snapshot(usernames, profiles_version=1, version=1):
+    profiles = pd.DataFrame({"usuario": usernames}, columns=db.PROFILE_HEADERS)
+    return db.Snapshot(version, pd.DataFrame(columns=db.EVAL_HEADERS), profiles_version, profiles)
+
+
+def test_shared_table_uses_the_requested_target():
+    table = assignments.AssignmentTable()
+    one = table.table(10, ADMINS, {}, _snapshot(["a", "b", "c"]), target=1)
+    two = table.table(10, ADMINS, {}, _snapshot(["a", "b", "c"]), target=2)
+    assert list(one.at["b", "estudantes"]) == []
+    assert list(two.at["b", "estudantes"]) == list(range(10))
+
+
+def test_shared_table_follows_the_profiles_version():
+    table = assignments.AssignmentTable()
+    first = table.table(20, ADMINS, {}, _snapshot(["a"]))
+    assert table.table(20, ADMINS, {}, _snapshot(["a", "b"])) is first   # mesma versão
+    second = table.table(20, ADMINS, {}, _snapshot(["a", "b"], profiles_version=2))
+    assert list(second.index) == ["a", "b"]
+    assert table.table(20, ADMINS, {}, _snapshot(["a"], profiles_version=None)) is None
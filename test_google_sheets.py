@@ -0,0 +1,169 @@
+import threading
+import time
+
+import pytest
+
+import fake_sheets
+import google_sheets as db
+
+PROFILES = [{"usuario": f"u{i}", "nome_completo": f"Nome {i}"} for i in range(3)]
+
+
+def _evaluation(i: int, reviewer: str = "u0", result: str = "Atendeu") -> dict:
+    return {
+        "user_key": f"Conversa {i}_{reviewer}",
+        "estudante": f"Estudante {i}",
+        "email_original": f"Conversa {i}",
+        "avaliador": reviewer,
+        "denomine": result,
+    }
+
+
+@pytest.fixture
+def sheet():
+    sh = fake_sheets.populate(
+        fake_sheets.FakeSpreadsheet(), db.EVAL_HEADERS, db.PROFILE_HEADERS,
+        [_evaluation(i) for i in range(1, 4)], PROFILES,
+    )
+    db.use_spreadsheet(sh)
+    assert db.init_sheet()
+    db.get_all_evaluations()
+    sh.reset_stats()
+    return sh
+
+
+def test_joint_download_started_before_a_save_is_not_published(sheet):
+    db.expire_evaluations_cache()
+    version = db._evaluations.version
+    evaluations, _, revision = db._fetch_all()
+
+    assert db.save_evaluation(_evaluation(1, result="Não Atendeu"))
+    db._evaluations.prime(evaluations, revision, version)
+
+    assert db.get_evaluation("Conversa 1_u0")["denomine"] == "Não Atendeu"
+
+
+def _rows(sheet) -> dict:
+    """user_key → [linhas] da aba de avaliações (contagem de cópias)."""
+    rows = {}
+    for row in sheet._sheets[0].rows[1:]:
+        rows.setdefault(row[0], []).append(dict(zip(db.EVAL_HEADERS, row)))
+    return rows
+
+
+def test_concurrent_appends_of_the_same_key_leave_one_row(sheet):
+    ws = db._connection.worksheet(0)
+    key = "Conversa 9_u1"
+    _, next_row = db._evaluations.cached_location(key)
+    start = threading.Barrier(2)
+    results = {}
+
+    def write(result):
+        start.wait()
+        row = _evaluation(9, "u1", result)
+        # Os dois escritores partem do mesmo cache: chave nova, mesma próxima linha
+        results[result] = db._write_batch(ws, db.EVAL_HEADERS, [row], {key: None}, next_row)
+
+    threads = [threading.Thread(target=write, args=(r,)) for r in ("Atendeu", "Não Atendeu")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    rows = _rows(sheet)
+    assert len(rows[key]) == 1
+    assert len(sheet._sheets[0].rows) == 1 + 4
+    assert sorted(results.values()) == [False, True]   # o segundo descarta o cache
+    last = next(r for r, ok in results.items() if not ok)
+    assert rows[key][0]["denomine"] == last
+
+
+def test_row_deleted_by_hand_is_not_overwritten_by_a_cached_update(sheet):
+    del sheet._sheets[0].rows[1]   # "Conversa 1" removida na interface do Sheets
+
+    assert db.save_evaluation(_evaluation(3, result="Não Atendeu"))
+
+    rows = _rows(sheet)
+    assert rows["Conversa 2_u0"][0]["denomine"] == "Atendeu"   # agora na linha do cache
+    assert [r["denomine"] for r in rows["Conversa 3_u0"]] == ["Não Atendeu"]
+    assert len(sheet._sheets[0].rows) == 1 + 2
+    assert db.get_evaluation("Conversa 3_u0")["denomine"] == "Não Atendeu"
+
+
+def _control(sheet):
+    return next(ws for ws in sheet._sheets if ws.title == db.CONTROL_SHEET)
+
+
+def _raw(evaluation: dict) -> list:
+    return [evaluation.get(h, "") for h in db.EVAL_HEADERS]
+
+
+def test_rows_appended_by_another_instance_are_merged_from_the_tail(sheet):
+    sheet._sheets[0].rows.append(_raw(_evaluation(4, "u1")))   # append: a revisão não muda
+    db.expire_evaluations_cache()
+
+    assert db.get_evaluation("Conversa 4_u1")["avaliador"] == "u1"
+    assert len(db.get_all_evaluations()) == 4
+    stats = sheet.stats()
+    assert stats["calls"] == {"values_batch_get": 1}
+    assert stats["cells"] < len(db.EVAL_HEADERS) * 3   # só a partir da última linha conhecida
+
+
+def test_in_place_edit_by_another_instance_forces_a_full_reload(sheet):
+    sheet._sheets[0].rows[1] = _raw(_evaluation(1, result="Não Atendeu"))
+    _control(sheet).rows[0][1] = "revisao-de-outra-instancia"
+    db.expire_evaluations_cache()
+
+    assert db.get_evaluation("Conversa 1_u0")["denomine"] == "Não Atendeu"
+    # verificação barata (revisão diferente) + download completo
+    assert sheet.stats()["calls"] == {"values_batch_get": 2}
+    assert db._evaluations.current_revision() == "revisao-de-outra-instancia"
+
+
+def test_full_refresh_after_max_age_picks_up_edits_without_a_revision(sheet, monkeypatch):
+    # Edição à mão na interface do Sheets: não passa por _batch_update
+    sheet._sheets[0].rows[1] = _raw(_evaluation(1, result="Não Atendeu"))
+    db.expire_evaluations_cache()
+    assert db.get_evaluation("Conversa 1_u0")["denomine"] == "Atendeu"
+    delta = sheet.stats()
+    assert delta["calls"] == {"values_batch_get": 1}
+
+    monkeypatch.setattr(db, "DEFAULT_EVAL_FULL_REFRESH_MAX_AGE", 0)
+    sheet.reset_stats()
+    db.expire_evaluations_cache()
+    assert db.get_evaluation("Conversa 1_u0")["denomine"] == "Não Atendeu"
+    stats = sheet.stats()
+    assert stats["calls"] == {"values_batch_get": 1}   # direto ao download completo
+    assert stats["cells"] > 2 * delta["cells"]
+
+
+def test_failed_write_is_reported_and_the_cache_discarded(sheet, monkeypatch):
+    def reject(body):
+        raise RuntimeError("HTTP 400")   # não transitório: sem retentativas
+
+    monkeypatch.setattr(sheet, "values_batch_update", reject)
+    version = db._evaluations.version
+
+    assert db.save_evaluation(_evaluation(1, result="Não Atendeu")) is False
+    assert db._evaluations.version != version
+    assert _rows(sheet)["Conversa 1_u0"][0]["denomine"] == "Atendeu"
+
+
+def test_slow_write_is_reported_as_pending_and_still_lands(sheet, monkeypatch):
+    release = threading.Event()
+    write = sheet.values_batch_update
+
+    def slow(body):
+        release.wait(5)
+        return write(body)
+
+    monkeypatch.setattr(sheet, "values_batch_update", slow)
+    monkeypatch.setattr(db, "_write_timeout", lambda: 0.05)
+
+    assert db.save_evaluation(_evaluation(1, result="Não Atendeu"))   # pendente, não falha
+    assert _rows(sheet)["Conversa 1_u0"][0]["denomine"] == "Atendeu"
+    release.set()
+    deadline = time.monotonic() + 5
+    while _rows(sheet)["Conversa 1_u0"][0]["denomine"] != "Não Atendeu":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+from local_store import LocalStore
+
+COLUMNS = ["user_key", "denomine"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalStore(str(tmp_path / "local.sqlite3"), {"evaluations": ("user_key", COLUMNS)})
+
+
+def test_merge_remote_never_overwrites_a_dirty_row(store):
+    store.merge_remote("evaluations", [{"user_key": "k", "denomine": "Atendeu"}])
+    store.upsert("evaluations", {"user_key": "k", "denomine": "Não Atendeu"}, dirty=True)
+
+    assert store.merge_remote("evaluations", [{"user_key": "k", "denomine": "Atendeu"}]) == 0
+    assert store.records("evaluations") == [{"user_key": "k", "denomine": "Não Atendeu"}]
+    assert [row for row, _ in store.dirty("evaluations")] == [{"user_key": "k", "denomine": "Não Atendeu"}]
+
+
+def test_merge_remote_counts_only_changed_rows(store):
+    remote = [{"user_key": f"k{i}", "denomine": i} for i in range(3)]
+    assert store.merge_remote("evaluations", remote) == 3
+    assert store.merge_remote("evaluations", remote) == 0   # 1 == "1": sem mudança
+    remote[1]["denomine"] = "x"
+    assert store.merge_remote("evaluations", remote) == 1
+    assert store.pending() == {"evaluations": 0}
+
+
+def test_local_saves_during_merge_stay_pending(store):
+    keys = [f"k{i}" for i in range(500)]
+    remote = [{"user_key": k, "denomine": "remoto"} for k in keys]
+    store.merge_remote("evaluations", remote)
+    start = threading.Barrier(2)
+
+    def save_locally():
+        start.wait()
+        for k in keys:
+            store.upsert("evaluations", {"user_key": k, "denomine": "local"}, dirty=True)
+
+    def merge():
+        start.wait()
+        for _ in range(20):
+            store.merge_remote("evaluations", [dict(r, denomine="novo") for r in remote])
+
+    threads = [threading.Thread(target=save_locally), threading.Thread(target=merge)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(r["denomine"] == "local" for r in store.records("evaluations"))
+    assert store.pending() == {"evaluations": len(keys)}
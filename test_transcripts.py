@@ -0,0 +1,20 @@
+import io
+import json
+
+import pytest
+
+import transcripts
+
+
+@pytest.mark.parametrize("chunk", range(1, 12))
+def test_iter_json_array_numbers_split_across_chunks(monkeypatch, chunk):
+    data = [1.5e10, -2.25E-3, 12345, 0.5, {"a": 1e2}, "x", True, None, 7]
+    text = "[" + ",\t".join(json.dumps(v) for v in data) + "]"
+    monkeypatch.setattr(transcripts, "READ_CHUNK", chunk)
+    assert list(transcripts.iter_json_array(io.StringIO(text))) == data
+
+
+def test_iter_json_array_rejects_truncated_number(monkeypatch):
+    monkeypatch.setattr(transcripts, "READ_CHUNK", 7)
+    with pytest.raises(ValueError):
+        list(transcripts.iter_json_array(io.StringIO("[1.5e")))
@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from write_queue import WriteQueue
+
+
+class _Flush:
+    """Função de envio que registra os lotes e segura o primeiro até `release`."""
+
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, table, rows):
+        self.batches.append((table, rows))
+        self.started.set()
+        self.release.wait(5)
+        if self.error and len(self.batches) == 1:
+            raise self.error
+
+
+def test_same_key_queued_before_a_flush_is_written_once_with_the_last_value():
+    flush = _Flush()
+    queue = WriteQueue(flush, window=0)
+    first = queue.submit("evaluations", "a", {"v": 0})
+    assert flush.started.wait(5)   # "a" em envio: as próximas esperam o lote seguinte
+
+    old = queue.submit("evaluations", "k", {"v": 1})
+    new = queue.submit("evaluations", "k", {"v": 2})
+    assert new is old and queue.pending() == 1
+    flush.release.set()
+
+    assert first.result(5) and new.result(5)
+    assert flush.batches == [("evaluations", [{"v": 0}]), ("evaluations", [{"v": 2}])]
+    assert (queue.batches, queue.writes, queue.coalesced) == (2, 2, 1)
+
+
+def test_failed_flush_fails_its_futures_and_the_queue_keeps_working():
+    flush = _Flush(error=RuntimeError("HTTP 400"))
+    queue = WriteQueue(flush, window=0)
+    failed = queue.submit("profiles", "u0", {"usuario": "u0"})
+    assert flush.started.wait(5)
+    later = queue.submit("profiles", "u1", {"usuario": "u1"})
+    flush.release.set()
+
+    with pytest.raises(RuntimeError, match="HTTP 400"):
+        failed.result(5)
+    assert later.result(5)
+    assert (queue.batches, queue.writes) == (1, 1)
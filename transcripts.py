@@ -0,0 +1,371 @@
+"""
+transcripts.py — Compilação da exportação do ChatGPT em um armazenamento
+compacto de transcrições, uma por estudante.
+
+A exportação (`conversations.json`) guarda cada conversa como uma árvore
+(`mapping`) que precisa ser percorrida de `current_node` até a raiz. Este
+módulo faz isso uma única vez e grava, ao lado do arquivo de origem:
+
+    conversations.store/
+        transcripts-<assinatura>.jsonl  # uma linha por estudante: [[role, text, time], ...]
+        index.json                      # título, ID anônimo, nº de mensagens e offsets
+
+O arquivo de transcrições é mapeado em memória (mmap) e só a conversa
+visualizada é decodificada; o processo mantém residente apenas o índice,
+independentemente do tamanho da exportação.
+
+A exportação é lida em fluxo (um elemento do array por vez), então nem a
+compilação precisa materializar o documento inteiro: o pico de memória é
+o da maior conversa, não o do arquivo.
+
+Também aceita a exportação em HTML (`chat.html`), que traz o mesmo array
+embutido como `var jsonData = [...]`: o importador localiza o literal com
+uma varredura em blocos e o entrega ao mesmo leitor em fluxo.
+
+Como usar:
+    python transcripts.py compile "conversations.json"
+    python transcripts.py import chat.html
+
+O app também compila automaticamente na inicialização se o armazenamento
+não existir ou estiver desatualizado em relação ao arquivo de origem.
+"""
+
+import json
+import mmap
+import os
+import sys
+from array import array
+
+STORE_VERSION = 2
+INDEX_FILE = "index.json"
+
+
+# ─── Linearização ─────────────────────────────────────────────────────────────
+
+def linearize(mapping, current_node):
+    """Percorre a árvore de `current_node` até a raiz e retorna as mensagens em ordem."""
+    messages = []
+    node_id = current_node
+
+    while node_id:
+        node = mapping.get(node_id)
+        if not node:
+            break
+
+        msg_obj = node.get('message')
+        if msg_obj and msg_obj.get('author') and msg_obj.get('content'):
+            role = msg_obj['author']['role']
+            content = msg_obj['content'].get('parts', [])
+            create_time = msg_obj.get('create_time') or 0
+
+            # Filter valid roles and non-empty content
+            if role in ['user', 'assistant']:
+                text = " ".join([str(p) for p in content if p and isinstance(p, str) and str(p).strip()])
+                if text:
+                    messages.append({'role': role, 'text': text, 'time': create_time})
+
+        node_id = node.get('parent')
+
+    # Since we traversed from end to start, reverse the list
+    messages.reverse()
+    return messages
+
+
+# ─── Leitura em Fluxo ─────────────────────────────────────────────────────────
+
+READ_CHUNK = 1 << 16   # 64 KiB
+
+# Caracteres que podem continuar um número JSON já decodificado
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def iter_json_array(f, buf: str = ""):
+    """
+    Itera os elementos de um array JSON lendo `f` em blocos, sem carregar o
+    documento inteiro. `buf` é texto já lido de `f` que precede o restante
+    (útil quando o array está embutido em outro arquivo).
+    """
+    decoder = json.JSONDecoder()
+    pos = 0
+    eof = False
+    want = READ_CHUNK
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(want)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    skip_ws()
+    if pos >= len(buf) or buf[pos] != '[':
+        raise ValueError("Array JSON esperado no início do conteúdo.")
+    pos += 1
+
+    while True:
+        skip_ws()
+        if pos >= len(buf):
+            raise ValueError("Array JSON não terminado.")
+        if buf[pos] == ']':
+            return
+        if buf[pos] == ',':
+            pos += 1
+            continue
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+            # Número no fim do buffer, ou seguido de um caractere que poderia
+            # continuá-lo (ex.: "1." + "5e10"), pode estar truncado
+            complete = eof or (end < len(buf) and not (
+                _is_number(item) and buf[end] in _NUMBER_CHARS
+            ))
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            fill()
+            want *= 2   # elemento grande: lê blocos maiores e evita reanalisar muitas vezes
+            continue
+        want = READ_CHUNK
+        pos = end
+        yield item
+
+
+def iter_conversations(source_path: str):
+    """Itera as conversas da exportação `conversations.json`, uma por vez."""
+    with open(source_path, 'r', encoding='utf-8') as f:
+        yield from iter_json_array(f)
+
+
+HTML_MARKER = "var jsonData"
+
+
+def iter_html_conversations(html_path: str):
+    """
+    Itera as conversas embutidas em `var jsonData = [...]` de um chat.html,
+    lendo o arquivo em blocos (sem regex sobre o arquivo inteiro).
+    """
+    with open(html_path, 'r', encoding='utf-8') as f:
+        window = ""
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                raise ValueError(f"'{HTML_MARKER}' não encontrado em '{html_path}'.")
+            window += chunk
+            at = window.find(HTML_MARKER)
+            if at >= 0:
+                break
+            # Mantém só o suficiente para achar o marcador dividido entre blocos
+            window = window[-(len(HTML_MARKER) - 1):]
+
+        rest = window[at + len(HTML_MARKER):]
+        while "=" not in rest:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                raise ValueError(f"Atribuição de '{HTML_MARKER}' incompleta em '{html_path}'.")
+            rest += chunk
+        yield from iter_json_array(f, rest[rest.index("=") + 1:])
+
+
+def iter_source(source_path: str):
+    """Conversas de `source_path`, seja conversations.json ou chat.html."""
+    if source_path.lower().endswith((".html", ".htm")):
+        return iter_html_conversations(source_path)
+    return iter_conversations(source_path)
+
+
+def iter_transcripts(conversations):
+    """
+    Reduz cada conversa a (título, conversation_id, mensagens lineares),
+    descartando a árvore `mapping` assim que é percorrida.
+    """
+    for conv in conversations:
+        messages = linearize(conv.get('mapping', {}), conv.get('current_node'))
+        yield (
+            conv.get('title', 'Sem Título'),
+            conv.get('conversation_id') or conv.get('id'),
+            messages,
+        )
+
+
+# ─── Compilação ───────────────────────────────────────────────────────────────
+
+def store_dir_for(source_path: str) -> str:
+    """Diretório do armazenamento compilado de `source_path`."""
+    base, _ = os.path.splitext(source_path)
+    return base + ".store"
+
+
+def _source_signature(source_path: str) -> dict:
+    stat = os.stat(source_path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def compile_store(source_path: str, store_dir: str = None) -> str:
+    """
+    Compila a exportação `source_path` (JSON ou chat.html) e retorna o
+    diretório do armazenamento.
+    Os arquivos são escritos em temporários e trocados no final, então um
+    leitor nunca vê um armazenamento pela metade.
+    """
+    store_dir = store_dir or store_dir_for(source_path)
+    os.makedirs(store_dir, exist_ok=True)
+    signature = _source_signature(source_path)
+
+    # Nome único por versão da origem: um processo que ainda mapeia o arquivo
+    # anterior não impede a troca (no Windows, arquivo mapeado não é substituível).
+    transcripts_file = f"transcripts-{signature['mtime_ns']}-{signature['size']}.jsonl"
+    transcripts_path = os.path.join(store_dir, transcripts_file)
+
+    students = []
+    with open(transcripts_path + ".tmp", 'wb') as out:
+        for i, (title, conversation_id, messages) in enumerate(
+            iter_transcripts(iter_source(source_path))
+        ):
+            line = json.dumps(
+                [[m['role'], m['text'], m['time']] for m in messages],
+                ensure_ascii=False,
+            ).encode('utf-8') + b"\n"
+            students.append({
+                "title": title,
+                "anon_id": f"Estudante {i + 1}",
+                "conversation_id": conversation_id,
+                "messages": len(messages),
+                "offset": out.tell(),
+                "length": len(line),
+            })
+            out.write(line)
+
+    index = {
+        "version": STORE_VERSION,
+        "source": signature,
+        "transcripts": transcripts_file,
+        "students": students,
+    }
+    index_path = os.path.join(store_dir, INDEX_FILE)
+    with open(index_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+
+    os.replace(transcripts_path + ".tmp", transcripts_path)
+    os.replace(index_path + ".tmp", index_path)
+
+    for name in os.listdir(store_dir):
+        if name.startswith("transcripts-") and name != transcripts_file:
+            try:
+                os.remove(os.path.join(store_dir, name))
+            except OSError:
+                pass  # ainda mapeado por outro processo; removido na próxima compilação
+    return store_dir
+
+
+def is_stale(source_path: str, store_dir: str = None) -> bool:
+    """True se o armazenamento não existe ou foi gerado de outra versão do arquivo."""
+    store_dir = store_dir or store_dir_for(source_path)
+    try:
+        with open(os.path.join(store_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return True
+    return (
+        index.get("version") != STORE_VERSION
+        or index.get("source") != _source_signature(source_path)
+    )
+
+
+# ─── Leitura ──────────────────────────────────────────────────────────────────
+
+class TranscriptStore:
+    """
+    Acesso somente leitura a um armazenamento compilado.
+
+    Mantém em memória só o índice (títulos, IDs e offsets em arrays); as
+    transcrições são lidas do arquivo mapeado e decodificadas sob demanda.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        students = index["students"]
+        self.titles = [s["title"] for s in students]
+        self._offsets = array('q', (s["offset"] for s in students))
+        self._lengths = array('q', (s["length"] for s in students))
+        self._by_conversation_id = {
+            s["conversation_id"]: i for i, s in enumerate(students) if s["conversation_id"]
+        }
+
+        self._file = open(os.path.join(store_dir, index["transcripts"]), 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def __len__(self):
+        return len(self.titles)
+
+    def title(self, idx: int) -> str:
+        return self.titles[idx]
+
+    def position(self, conversation_id: str):
+        """Índice do estudante pelo `conversation_id`, ou None."""
+        return self._by_conversation_id.get(conversation_id)
+
+    def messages(self, idx: int) -> list:
+        """Mensagens (role, text, time) do estudante `idx`, decodificadas sob demanda."""
+        start = self._offsets[idx]
+        raw = self._mm[start:start + self._lengths[idx]]
+        return [{'role': r, 'text': t, 'time': tm} for r, t, tm in json.loads(raw)]
+
+    def messages_by_id(self, conversation_id: str) -> list:
+        """Mensagens pelo `conversation_id` (lista vazia se não existir)."""
+        idx = self.position(conversation_id)
+        return [] if idx is None else self.messages(idx)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+
+def open_store(source_path: str):
+    """
+    Abre o armazenamento de `source_path`, compilando-o antes se necessário.
+    Retorna None se o arquivo de origem não existir.
+    """
+    if not os.path.exists(source_path):
+        return None
+    store_dir = store_dir_for(source_path)
+    if is_stale(source_path, store_dir):
+        compile_store(source_path, store_dir)
+    return TranscriptStore(store_dir)
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2 or argv[0] not in ("compile", "import"):
+        print('Uso: python transcripts.py compile "conversations.json" [diretorio_saida]')
+        print('     python transcripts.py import chat.html [diretorio_saida]')
+        return 2
+    store_dir = compile_store(argv[1], argv[2] if len(argv) > 2 else None)
+    store = TranscriptStore(store_dir)
+    print(f"{len(store)} transcrições compiladas em '{store_dir}'.")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
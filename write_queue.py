@@ -0,0 +1,95 @@
+"""
+write_queue.py — Fila de escrita do processo para o Google Sheets.
+
+Quando vários avaliadores salvam ao mesmo tempo, cada gravação isolada
+(`update`/`append_row`) consome uma requisição da cota de escrita da
+planilha (HTTP 429 em turmas grandes). A fila entrega as gravações em lotes
+à função de envio, que grava tudo com uma chamada por aba:
+
+  - com a fila ociosa, a gravação é enviada na hora (sem esperar janela);
+  - as que chegam durante um envio (sob carga) esperam o fim dele e mais
+    `window` segundos, e vão juntas no próximo lote;
+  - gravações repetidas da mesma chave na janela viram uma só (vale a última);
+  - cada quem enviou recebe um `Future`, concluído quando o lote é gravado
+    (ou com a exceção do envio, se ele falhar).
+
+Assim uma gravação isolada custa só a latência da API, e sob carga o número
+de requisições cresce com o número de janelas, não com o de avaliadores.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+
+class WriteQueue:
+    """
+    Agrupa gravações por tabela e chave; uma thread envia cada lote com
+    `flush(tabela, linhas)`: na hora, se ociosa; sob carga, agrupando por
+    `window` segundos.
+    """
+
+    def __init__(self, flush, window: float = 0.5):
+        self._flush = flush
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = {}   # tabela → {chave: (linha, Future)}
+        self._wake = threading.Event()
+        self._thread = None
+        self._sending = False
+        self._under_load = False   # chegaram gravações durante o envio
+        self.batches = 0
+        self.writes = 0
+        self.coalesced = 0
+
+    def submit(self, table: str, key, row: dict) -> Future:
+        """
+        Enfileira `row` e retorna o Future da gravação. Se a mesma chave já
+        está na fila, substitui a linha e devolve o mesmo Future.
+        """
+        with self._lock:
+            entries = self._pending.setdefault(table, {})
+            if key in entries:
+                future = entries[key][1]
+                self.coalesced += 1
+            else:
+                future = Future()
+            entries[key] = (row, future)
+            if self._sending:
+                self._under_load = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pbic-writes", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return future
+
+    def pending(self) -> int:
+        """Quantidade de gravações aguardando envio."""
+        with self._lock:
+            return sum(len(entries) for entries in self._pending.values())
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            if self._under_load:
+                time.sleep(self.window)   # janela de agrupamento
+            with self._lock:
+                self._wake.clear()
+                batch, self._pending = self._pending, {}
+                self._sending, self._under_load = True, False
+            for table, entries in batch.items():
+                self._send(table, entries)
+            with self._lock:
+                self._sending = False
+
+    def _send(self, table: str, entries: dict):
+        try:
+            self._flush(table, [row for row, _ in entries.values()])
+        except Exception as e:
+            for _, future in entries.values():
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.writes += len(entries)
+        for _, future in entries.values():
+            future.set_result(True)